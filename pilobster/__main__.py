@@ -6,10 +6,6 @@ import logging
 import sys
 
 from .config import load_config
-from .memory import Memory
-from .agent import Agent
-from .scheduler import Scheduler
-from .workspace import Workspace
 
 # Single user mode - user_id is handled internally by Memory class
 
@@ -174,23 +170,30 @@ async def main():
             logger.error("Set your token or use --mode tui to skip Telegram")
             sys.exit(1)
 
-    # Initialise memory
-    memory = Memory(config.memory.database)
-    await memory.connect()
-    logger.info(f"Database connected: {config.memory.database}")
+    # Import components only once we know we're starting (keeps --help fast)
+    from .memory import Memory
+    from .agent import Agent
+    from .scheduler import Scheduler
+    from .workspace import Workspace
 
-    # Initialise agent
+    # Create components
+    memory = Memory(config.memory.database)
     agent = Agent(config.ollama, config.system_prompt)
-    await agent.warm_up()
-
-    # Initialise workspace
     workspace = Workspace(config.workspace.path, memory)
     logger.info(f"Workspace: {workspace.path.resolve()}")
-
-    # Initialise scheduler
     scheduler = Scheduler(memory)
+
+    async def init_storage():
+        """Connect the database, then load jobs (which need the database)."""
+        await memory.connect()
+        logger.info(f"Database connected: {config.memory.database}")
+        if config.scheduler.enabled:
+            await scheduler.load_jobs()
+
+    # Model warm-up and database setup are independent — run them together
+    await asyncio.gather(init_storage(), agent.warm_up())
+
     if config.scheduler.enabled:
-        await scheduler.load_jobs()
         scheduler.start()
 
     # Start selected mode(s)
@@ -244,6 +247,7 @@ async def main():
         # Cleanup
         logger.info("Shutting down...")
         scheduler.stop()
+        await agent.close()
         await memory.close()
         logger.info("Goodbye! 🦞")
 
@@ -2,11 +2,19 @@
 
 import re
 import json
+import asyncio
+import functools
 import logging
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
 from pathlib import Path
 import httpx
 
+# orjson is optional; it parses JSON several times faster than the stdlib
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 from .config import OllamaConfig
 
 logger = logging.getLogger("pilobster.agent")
@@ -14,6 +22,27 @@ logger = logging.getLogger("pilobster.agent")
 # Memory file settings
 MEMORY_FILE = Path("memory.md")
 MAX_MEMORY_LINES = 100  # Warn if memory exceeds this many lines
+MEMORY_PROMPT_HEADER = (
+    "\n\n## Personal Memory\n"
+    "These are important facts to remember about the user:\n"
+)
+
+# Responses longer than this (in chars) are parsed in a worker thread
+THREADED_PARSE_THRESHOLD = 16_000
+
+# History trimming: rough token estimate, and context kept free for the reply
+CHARS_PER_TOKEN = 4
+RESPONSE_TOKEN_RESERVE = 1024
+
+# Structured block patterns, compiled once and shared by the parsers
+_CRON_RE = re.compile(r"```cron\s*\n(.*?)\n\s*```", re.DOTALL)
+_SAVE_RE = re.compile(r"```save:(\S+)\s*\n(.*?)\n\s*```", re.DOTALL)
+_MEMORY_RE = re.compile(r"```memory\s*\n(.*?)\n\s*```", re.DOTALL)
+_CODE_RE = re.compile(r"```(\w+)?\s*\n(.*?)\n\s*```", re.DOTALL)
+# Five cron fields (minute hour day month weekday); names like "mon-fri" are allowed
+_CRON_SCHEDULE_RE = re.compile(r"\s*(?:[\w*,/-]+\s+){4}[\w*,/-]+\s*")
+# Any structured block in one alternation: (kind, save filename, payload)
+_BLOCK_RE = re.compile(r"```(cron|memory|save:(\S+))\s*\n(.*?)\n\s*```", re.DOTALL)
 
 
 class Agent:
@@ -23,8 +52,22 @@ class Agent:
         self.config = config
         self.base_prompt = system_prompt
         self.memory_content = self._load_memory()
-        self.system_prompt = self._build_full_prompt()
-        self.http_client = httpx.AsyncClient(timeout=120.0)
+        # Normalised memory lines, for O(1) duplicate checks
+        self._memory_facts = self._parse_facts(self.memory_content)
+        self._refresh_system_prompt()
+        # Bound concurrent Ollama requests; identical concurrent chats share one request
+        self._request_gate = asyncio.Semaphore(config.max_concurrent)
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        # One long-lived client so the connection to Ollama is reused between turns
+        self.http_client = httpx.AsyncClient(
+            base_url=config.host,
+            timeout=httpx.Timeout(120.0, connect=5.0),
+            limits=httpx.Limits(
+                max_keepalive_connections=4,
+                max_connections=8,
+                keepalive_expiry=300.0,
+            ),
+        )
 
     def _load_memory(self) -> str:
         """Load memory.md file if it exists."""
@@ -32,24 +75,64 @@ class Agent:
             try:
                 content = MEMORY_FILE.read_text(encoding="utf-8").strip()
                 if content:
-                    logger.info(f"Loaded {len(content.splitlines())} lines from memory.md")
+                    logger.info("Loaded %d lines from memory.md", content.count("\n") + 1)
                     return content
             except Exception as e:
-                logger.warning(f"Failed to load memory.md: {e}")
+                logger.warning("Failed to load memory.md: %s", e)
         return ""
 
+    @staticmethod
+    def _parse_facts(content: str) -> Set[str]:
+        """Return the set of non-empty memory lines, without their "- " list marker."""
+        facts = set()
+        for line in content.splitlines():
+            line = line.strip()
+            if line:
+                facts.add(line[2:].strip() if line.startswith("- ") else line)
+        return facts
+
     def _build_full_prompt(self) -> str:
         """Build the full system prompt including memory."""
         if self.memory_content:
-            return f"{self.base_prompt}\n\n## Personal Memory\nThese are important facts to remember about the user:\n{self.memory_content}"
+            return self.base_prompt + MEMORY_PROMPT_HEADER + self.memory_content
         return self.base_prompt
 
+    def _refresh_system_prompt(self):
+        """Rebuild the system prompt and the cached system message sent with each chat."""
+        self.system_prompt = self._build_full_prompt()
+        self._system_message = {"role": "system", "content": self.system_prompt}
+
+    def _fit_history(self, messages: List[dict]) -> List[dict]:
+        """Drop the oldest messages that won't fit in the model's context window.
+
+        Ollama would truncate an over-long prompt anyway, after spending
+        time processing it; trimming here sends only what the model can
+        use. The window starts on a user turn rather than an orphaned
+        reply, and the newest message is always kept.
+        """
+        budget = (
+            self.config.context_length
+            - RESPONSE_TOKEN_RESERVE
+            - len(self.system_prompt) // CHARS_PER_TOKEN
+        )
+        start = len(messages)
+        while start > 0:
+            budget -= len(messages[start - 1]["content"]) // CHARS_PER_TOKEN
+            if budget < 0 and start < len(messages):
+                break
+            start -= 1
+        while start < len(messages) - 1 and messages[start]["role"] == "assistant":
+            start += 1
+        if start:
+            logger.debug("Trimmed %d old message(s) to fit the context window", start)
+        return messages[start:]
+
     def check_memory_size(self) -> tuple[bool, int]:
         """Check if memory is getting too large.
 
         Returns: (is_large, line_count)
         """
-        lines = len(self.memory_content.splitlines()) if self.memory_content else 0
+        lines = len(self._memory_facts)
         return lines > MAX_MEMORY_LINES, lines
 
     async def save_to_memory(self, fact: str) -> bool:
@@ -57,28 +140,39 @@ class Agent:
 
         Returns True if saved successfully.
         """
+        fact = fact.strip()
+        # Check if fact already exists
+        if fact in self._memory_facts:
+            logger.debug("Fact already in memory: %s", fact)
+            return False
+        # Reserve it before the write, so a concurrent save of the same fact
+        # (e.g. from the TUI and Telegram at once) sees it as a duplicate
+        self._memory_facts.add(fact)
+
         try:
-            # Check if fact already exists
-            if self.memory_content and fact.strip() in self.memory_content:
-                logger.debug(f"Fact already in memory: {fact}")
-                return False
-
-            # Append to file
-            with open(MEMORY_FILE, "a", encoding="utf-8") as f:
-                if MEMORY_FILE.stat().st_size > 0:
-                    f.write("\n")
-                f.write(f"- {fact.strip()}\n")
-
-            # Reload memory
-            self.memory_content = self._load_memory()
-            self.system_prompt = self._build_full_prompt()
-
-            logger.info(f"Saved to memory: {fact}")
-            return True
+            # Append to file in a worker thread so SD-card I/O doesn't block the loop
+            line = f"- {fact}"
+            await asyncio.to_thread(self._append_memory_line, line)
         except Exception as e:
-            logger.error(f"Failed to save memory: {e}")
+            self._memory_facts.discard(fact)
+            logger.error("Failed to save memory: %s", e)
             return False
 
+        # Update the in-memory copy rather than re-reading the whole file
+        self.memory_content = f"{self.memory_content}\n{line}" if self.memory_content else line
+        self._refresh_system_prompt()
+
+        logger.info("Saved to memory: %s", fact)
+        return True
+
+    @staticmethod
+    def _append_memory_line(line: str):
+        """Append a line to memory.md (blocking)."""
+        with open(MEMORY_FILE, "a", encoding="utf-8") as f:
+            if f.tell() > 0:
+                f.write("\n")
+            f.write(f"{line}\n")
+
     def clear_memory(self) -> bool:
         """Clear all memory.
 
@@ -88,37 +182,64 @@ class Agent:
             if MEMORY_FILE.exists():
                 MEMORY_FILE.unlink()
             self.memory_content = ""
-            self.system_prompt = self._build_full_prompt()
+            self._memory_facts.clear()
+            self._refresh_system_prompt()
             logger.info("Memory cleared")
             return True
         except Exception as e:
-            logger.error(f"Failed to clear memory: {e}")
+            logger.error("Failed to clear memory: %s", e)
             return False
 
+    async def close(self):
+        """Close the HTTP connection pool to Ollama."""
+        await self.http_client.aclose()
+
     async def warm_up(self):
         """Pre-load the model so it's ready for fast responses."""
-        logger.info(f"Warming up model: {self.config.model}")
+        logger.info("Warming up model: %s", self.config.model)
         try:
-            # Send a simple warm-up request
-            await self._chat_request([{"role": "user", "content": "hi"}])
+            # An empty prompt makes Ollama load the model without generating
+            response = await self.http_client.post(
+                "/api/generate",
+                json={
+                    "model": self.config.model,
+                    "prompt": "",
+                    "stream": False,
+                    "keep_alive": self.config.keep_alive,
+                    # Same window as chat requests, or the first chat reloads the model
+                    "options": {"num_ctx": self.config.context_length},
+                },
+            )
+            if response.is_error:
+                # Older servers may not support this — fall back to a real chat
+                await self._chat_request([{"role": "user", "content": "hi"}])
             logger.info("Model loaded and ready")
         except Exception as e:
-            logger.warning(f"Warm-up failed, continuing anyway: {e}")
+            logger.warning("Warm-up failed, continuing anyway: %s", e)
             # Don't raise - allow bot to continue
 
-    async def _chat_request(self, messages: List[dict]) -> str:
-        """Low-level chat request using httpx for better Hailo compatibility."""
-        url = f"{self.config.host}/api/chat"
-        payload = {
+    def _chat_payload(self, messages: List[dict], stream: bool) -> dict:
+        """Build the request body for Ollama's /api/chat endpoint."""
+        return {
             "model": self.config.model,
             "messages": messages,
-            "stream": False,  # Non-streaming for simplicity
+            "stream": stream,
+            # Keep the model (and its prompt cache) resident between turns so the
+            # unchanged system prompt prefix isn't re-processed every message
+            "keep_alive": self.config.keep_alive,
+            # The window _fit_history trims to; Ollama's default may be smaller
+            "options": {"num_ctx": self.config.context_length},
         }
 
+    async def _chat_request(self, messages: List[dict]) -> str:
+        """Low-level chat request using httpx for better Hailo compatibility."""
+        url = "/api/chat"
+        payload = self._chat_payload(messages, stream=False)
+
         try:
             response = await self.http_client.post(url, json=payload)
             response.raise_for_status()
-            data = response.json()
+            data = json_loads(response.content)
             return data["message"]["content"]
         except httpx.ConnectError as e:
             raise Exception(f"Cannot connect to Ollama at {self.config.host}. Is Ollama running? ({e})")
@@ -129,18 +250,91 @@ class Agent:
         except Exception as e:
             raise Exception(f"Ollama request failed: {type(e).__name__}: {e}")
 
+    async def _chat_stream_request(self, messages: List[dict]) -> AsyncIterator[str]:
+        """Low-level streaming chat request; yields content as Ollama generates it."""
+        url = "/api/chat"
+        payload = self._chat_payload(messages, stream=True)
+
+        try:
+            async with self.http_client.stream("POST", url, json=payload) as response:
+                if response.is_error:
+                    body = (await response.aread()).decode(errors="replace")
+                    raise Exception(f"Ollama returned error {response.status_code}: {body}")
+                async for data in self._iter_ndjson(response):
+                    if "error" in data:
+                        raise Exception(f"Ollama returned error: {data['error']}")
+                    content = data["message"]["content"]
+                    if content:
+                        yield content
+                    if data.get("done"):
+                        break
+        except httpx.ConnectError as e:
+            raise Exception(f"Cannot connect to Ollama at {self.config.host}. Is Ollama running? ({e})")
+        except httpx.HTTPError as e:
+            raise Exception(f"Ollama request failed: {type(e).__name__}: {e}")
+        except KeyError as e:
+            raise Exception(f"Unexpected response format from Ollama (missing {e})")
+
+    @staticmethod
+    async def _iter_ndjson(response) -> AsyncIterator[dict]:
+        """Decode a newline-delimited JSON stream (Ollama's format) from raw bytes.
+
+        JSON is parsed straight from the bytes, skipping a UTF-8 decode per line.
+        """
+        buffer = b""
+        async for chunk in response.aiter_bytes():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json_loads(line)
+        if buffer.strip():
+            yield json_loads(buffer)
+
     async def chat(self, messages: List[dict]) -> str:
-        """Send a conversation to the model and return the response text."""
-        full_messages = [
-            {"role": "system", "content": self.system_prompt},
-            *messages,
-        ]
+        """Send a conversation to the model and return the response text.
 
+        The response is streamed and joined, so slow generations on a Pi
+        don't hit the read timeout as long as tokens keep arriving.
+        """
+        key = (self.system_prompt, tuple((m["role"], m["content"]) for m in messages))
+        while (pending := self._inflight.get(key)) is not None:
+            # Same conversation already being answered — wait for that reply.
+            # None means that caller was cancelled; ask again (or wait on
+            # whichever waiter asks first)
+            response = await asyncio.shield(pending)
+            if response is not None:
+                return response
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
         try:
-            return await self._chat_request(full_messages)
+            parts = [piece async for piece in self.chat_stream(messages)]
+            response = "".join(parts)
+            future.set_result(response)
+            return response
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                # Cancelled: release waiters without passing the cancellation on
+                future.set_result(None)
+
+    async def chat_stream(self, messages: List[dict]) -> AsyncIterator[str]:
+        """Send a conversation to the model and yield the response as it's generated.
+
+        Errors are yielded as an apology message rather than raised.
+        """
+        # Reuse the same system message so the prompt prefix is identical each turn
+        full_messages = [self._system_message]
+        full_messages.extend(self._fit_history(messages))
+
+        try:
+            async with self._request_gate:
+                async for piece in self._chat_stream_request(full_messages):
+                    yield piece
         except Exception as e:
-            logger.error(f"Ollama chat error: {e}")
-            return f"Sorry, I had trouble thinking about that. Error: {e}"
+            logger.error("Ollama chat error: %s", e)
+            yield f"Sorry, I had trouble thinking about that. Error: {e}"
 
     @staticmethod
     def parse_cron_blocks(text: str) -> tuple[List[dict], List[str]]:
@@ -153,33 +347,100 @@ class Agent:
 
         Returns: (valid_jobs, errors)
         """
-        pattern = r"```cron\s*\n(.*?)\n\s*```"
-        matches = re.findall(pattern, text, re.DOTALL)
         jobs = []
         errors = []
+        if "```" not in text:
+            return jobs, errors
+        for match in _CRON_RE.finditer(text):
+            Agent._parse_cron_job(match.group(1), jobs, errors)
+        return jobs, errors
 
-        for match in matches:
-            try:
-                job = json.loads(match.strip())
+    @staticmethod
+    def _parse_cron_job(payload: str, jobs: List[dict], errors: List[str]):
+        """Validate a single cron block payload, appending to jobs or errors."""
+        try:
+            job = json_loads(payload)
+        except json.JSONDecodeError:
+            logger.warning("Failed to parse cron block: %s", payload)
+            errors.append("Invalid JSON in cron block")
+            return
+
+        if not isinstance(job, dict):
+            errors.append("Cron block must be a JSON object")
+            return
+
+        # Validate required fields
+        schedule, task, message = job.get("schedule"), job.get("task"), job.get("message")
+        if schedule is None or task is None or message is None:
+            missing = [k for k in ("schedule", "task", "message") if job.get(k) is None]
+            errors.append(f"Missing required fields: {', '.join(missing)}")
+            return
+
+        # Validate cron format (should have 5 fields)
+        if not isinstance(schedule, str) or not _CRON_SCHEDULE_RE.fullmatch(schedule):
+            errors.append(f"Invalid cron format '{schedule}' - needs 5 fields (minute hour day month weekday)")
+            return
+
+        jobs.append({"schedule": schedule, "task": task, "message": message})
 
-                # Validate required fields
-                missing = [k for k in ("schedule", "task", "message") if k not in job]
-                if missing:
-                    errors.append(f"Missing required fields: {', '.join(missing)}")
-                    continue
+    @staticmethod
+    def parse_and_clean(text: str) -> dict:
+        """Parse every structured block and clean the response in one scan.
 
-                # Validate cron format (should have 5 fields)
-                schedule_parts = job["schedule"].split()
-                if len(schedule_parts) != 5:
-                    errors.append(f"Invalid cron format '{job['schedule']}' - needs 5 fields (minute hour day month weekday)")
-                    continue
+        Equivalent to calling parse_cron_blocks, parse_save_blocks,
+        parse_memory_blocks and clean_response, but walks the text once.
 
-                jobs.append(job)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse cron block: {match}")
-                errors.append(f"Invalid JSON in cron block")
+        Returns a dict with 'cron_jobs', 'cron_errors', 'save_blocks',
+        'memory' and 'clean' keys.
+        """
+        # Plain prose (the common case) has nothing to parse
+        if "```" not in text:
+            return {
+                "cron_jobs": [],
+                "cron_errors": [],
+                "save_blocks": [],
+                "memory": [],
+                "clean": text.strip(),
+            }
+
+        cron_jobs = []
+        cron_errors = []
+        save_blocks = []
+        memory = []
+        pieces = []
+        pos = 0
+
+        for match in _BLOCK_RE.finditer(text):
+            pieces.append(text[pos:match.start()])
+            pos = match.end()
+            kind, filename, payload = match.groups()
+            if kind == "cron":
+                Agent._parse_cron_job(payload, cron_jobs, cron_errors)
+            elif kind == "memory":
+                fact = payload.strip()
+                if fact:
+                    memory.append(fact)
+            else:
+                save_blocks.append({"filename": filename, "content": payload})
+
+        pieces.append(text[pos:])
+
+        return {
+            "cron_jobs": cron_jobs,
+            "cron_errors": cron_errors,
+            "save_blocks": save_blocks,
+            "memory": memory,
+            "clean": "".join(pieces).strip(),
+        }
 
-        return jobs, errors
+    async def parse_response(self, text: str) -> dict:
+        """Run parse_and_clean without blocking the event loop on huge responses.
+
+        Small responses are parsed inline; the thread hop isn't worth it.
+        """
+        if len(text) > THREADED_PARSE_THRESHOLD:
+            return await asyncio.to_thread(self.parse_and_clean, text)
+        return self.parse_and_clean(text)
 
     @staticmethod
     def parse_save_blocks(text: str) -> List[dict]:
@@ -190,9 +451,12 @@ class Agent:
             print("hello world")
             ```
         """
-        pattern = r"```save:(\S+)\s*\n(.*?)\n\s*```"
-        matches = re.findall(pattern, text, re.DOTALL)
-        return [{"filename": m[0], "content": m[1]} for m in matches]
+        if "```" not in text:
+            return []
+        return [
+            {"filename": m.group(1), "content": m.group(2)}
+            for m in _SAVE_RE.finditer(text)
+        ]
 
     @staticmethod
     def parse_memory_blocks(text: str) -> List[str]:
@@ -205,9 +469,10 @@ class Agent:
 
         Returns: List of facts to remember
         """
-        pattern = r"```memory\s*\n(.*?)\n\s*```"
-        matches = re.findall(pattern, text, re.DOTALL)
-        return [m.strip() for m in matches if m.strip()]
+        if "```" not in text:
+            return []
+        facts = (m.group(1).strip() for m in _MEMORY_RE.finditer(text))
+        return [fact for fact in facts if fact]
 
     @staticmethod
     def extract_code_blocks(text: str) -> List[dict]:
@@ -215,17 +480,60 @@ class Agent:
 
         Returns a list of dicts with 'language' and 'content' keys.
         """
-        pattern = r"```(\w+)?\s*\n(.*?)\n\s*```"
-        matches = re.findall(pattern, text, re.DOTALL)
+        if "```" not in text:
+            return []
         return [
-            {"language": m[0] or "text", "content": m[1].strip()}
-            for m in matches
+            {"language": m.group(1) or "text", "content": m.group(2).strip()}
+            for m in _CODE_RE.finditer(text)
         ]
 
     @staticmethod
+    def _clean_single_block(text: str) -> Optional[str]:
+        """Clean a response holding exactly one fenced block, without regex.
+
+        Mirrors the block patterns using str.find. Returns None when the
+        text isn't a simple single-block response, so the caller can fall
+        back to the regex path.
+        """
+        start = text.find("```")
+        end = text.find("```", start + 3)
+        if end == -1 or text.find("```", end + 3) != -1 or "````" in text:
+            return None
+
+        body = text[start + 3:end]
+        if body.startswith("cron"):
+            rest = body[4:]
+        elif body.startswith("memory"):
+            rest = body[6:]
+        elif body.startswith("save:"):
+            rest = body[5:]
+            name_len = 0
+            while name_len < len(rest) and not rest[name_len].isspace():
+                name_len += 1
+            if not name_len:
+                return text.strip()
+            rest = rest[name_len:]
+        else:
+            # An ordinary code block — nothing to remove
+            return text.strip()
+
+        # Opening line must end in whitespace + newline, closing fence must
+        # follow a newline + whitespace, and those must be different newlines
+        first_nl = rest.find("\n")
+        last_nl = rest.rfind("\n")
+        if first_nl == -1 or first_nl == last_nl or rest[:first_nl].strip() or rest[last_nl:].strip():
+            return text.strip()
+
+        return (text[:start] + text[end + 3:]).strip()
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
     def clean_response(text: str) -> str:
         """Remove cron, save, and memory blocks from the response for display."""
-        text = re.sub(r"```cron\s*\n.*?\n\s*```", "", text, flags=re.DOTALL)
-        text = re.sub(r"```save:\S+\s*\n.*?\n\s*```", "", text, flags=re.DOTALL)
-        text = re.sub(r"```memory\s*\n.*?\n\s*```", "", text, flags=re.DOTALL)
-        return text.strip()
+        if "```" not in text:
+            return text.strip()
+        # Most responses have at most one block; cut it out without regex
+        cleaned = Agent._clean_single_block(text)
+        if cleaned is not None:
+            return cleaned
+        return _BLOCK_RE.sub("", text).strip()
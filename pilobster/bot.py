@@ -1,12 +1,20 @@
 """Telegram bot — the user-facing interface for PiLobster."""
 
+import asyncio
+import functools
+import hashlib
 import logging
-from typing import Optional
-from telegram import Update, BotCommand
+import re
+from pathlib import Path
+from typing import FrozenSet, List, Optional, Tuple
+from telegram import Update, BotCommand, Message
+from telegram.error import BadRequest
 from telegram.ext import (
     Application,
+    ApplicationHandlerStop,
     CommandHandler,
     MessageHandler,
+    TypeHandler,
     ContextTypes,
     filters,
 )
@@ -19,6 +27,138 @@ from .workspace import Workspace
 
 logger = logging.getLogger("pilobster.telegram")
 
+# Bot commands: (command, handler method, menu description)
+_COMMANDS = [
+    ("start", "cmd_start", "Welcome message"),
+    ("status", "cmd_status", "System status"),
+    ("jobs", "cmd_jobs", "List scheduled tasks"),
+    ("schedule", "cmd_schedule", "Create a cron job"),
+    ("cancel", "cmd_cancel", "Cancel a scheduled task"),
+    ("workspace", "cmd_workspace", "List generated files"),
+    ("save", "cmd_save", "Save last code block"),
+    ("memory", "cmd_memory", "View saved memories"),
+    ("forget", "cmd_forget", "Clear all memories"),
+    ("clear", "cmd_clear", "Clear chat history"),
+    ("help", "cmd_help", "Show commands"),
+]
+
+_BOT_COMMANDS = [BotCommand(name, description) for name, _, description in _COMMANDS]
+
+# Commands that change the conversation, memory, jobs or workspace. They're
+# queued behind any turn in progress rather than run alongside it (e.g. a
+# /clear landing between a turn's user message and its reply)
+_QUEUED_COMMANDS = frozenset({"clear", "forget", "cancel", "save"})
+
+# Hash of the last command menu registered with Telegram, to skip re-sending it
+COMMANDS_HASH_FILE = Path.home() / ".cache" / "pilobster" / "commands_hash"
+
+# Static command replies, built once at import
+_START_MESSAGE = (
+    "🦞 *PiLobster is online!*\n\n"
+    "I'm your local AI assistant running on a Raspberry Pi.\n\n"
+    "Just send me a message to chat, or use:\n"
+    "/status — System status\n"
+    "/jobs — List scheduled tasks\n"
+    "/schedule — Create a cron job\n"
+    "/workspace — List generated files\n"
+    "/clear — Clear conversation history\n"
+    "/help — Show all commands"
+)
+
+_SAVE_USAGE = (
+    "Usage: `/save filename.py`\n"
+    "This will save the last code block from my response."
+)
+
+_SCHEDULE_USAGE = (
+    "Usage: `/schedule <cron> <prompt>`\n\n"
+    "The prompt will be sent to me when the job triggers.\n\n"
+    "Cron format: `minute hour day month weekday`\n\n"
+    "Examples:\n"
+    "`/schedule */3 * * * * Tell me a joke`\n"
+    "`/schedule 0 9 * * * Give me a motivational quote`\n"
+    "`/schedule 30 14 * * 1-5 Remind me to stand up`\n\n"
+    "Common patterns:\n"
+    "• `*/5 * * * *` — Every 5 minutes\n"
+    "• `0 * * * *` — Every hour\n"
+    "• `0 9 * * *` — Daily at 9am\n"
+    "• `0 9 * * 1` — Every Monday at 9am"
+)
+
+_HELP_MESSAGE = (
+    "🦞 *PiLobster Commands*\n\n"
+    "/start — Welcome message\n"
+    "/status — System status\n"
+    "/jobs — List scheduled tasks\n"
+    "/schedule <cron> <msg> — Create a cron job\n"
+    "/cancel <id> — Cancel a task\n"
+    "/workspace — List generated files\n"
+    "/save <filename> — Save last code block\n"
+    "/memory — View saved memories\n"
+    "/forget — Clear all memories\n"
+    "/clear — Clear chat history\n"
+    "/help — This message\n\n"
+    "*Natural Language:*\n"
+    "• Ask me to write code — I'll save it to the workspace\n"
+    "• Ask me to schedule something — I'll create a cron job\n"
+    "• Or just chat!"
+)
+
+# Telegram has a 4096 char limit per message — leave some headroom
+MESSAGE_CHUNK_SIZE = 4000
+
+# Minimum seconds between edits of a streamed reply (Telegram rate-limits edits)
+STREAM_EDIT_INTERVAL = 1.0
+
+# Opening fence of a cron, save, or memory block — never shown to the user
+_CONTROL_FENCE_RE = re.compile(r"```(?:cron|memory|save:)")
+
+
+def split_message(text: str, size: int = MESSAGE_CHUNK_SIZE) -> List[str]:
+    """Split text into chunks small enough to send as Telegram messages.
+
+    Splits at the last newline within each chunk where there is one, so
+    lines (and code blocks) aren't cut mid-way.
+    """
+    n = len(text)
+    if n <= size:
+        return [text]
+
+    chunks = []
+    start = 0
+    while n - start > size:
+        end = text.rfind("\n", start, start + size)
+        if end > start:
+            chunks.append(text[start:end])
+            start = end + 1  # The newline itself is dropped
+        else:
+            # No newline to split at — hard cut
+            chunks.append(text[start : start + size])
+            start += size
+    if start < n:
+        chunks.append(text[start:])
+    return chunks
+
+
+def cut_pending_block(text: str) -> str:
+    """Cut a partially streamed response before any unfinished control block.
+
+    A cron, save, or memory block whose closing fence hasn't arrived yet
+    (or a trailing fence whose language isn't known yet) is dropped, so
+    Agent.clean_response can remove the finished ones and the user never
+    sees raw block syntax mid-stream.
+    """
+    pending = None
+    for match in _CONTROL_FENCE_RE.finditer(text):
+        pending = match
+    if pending is not None and text.find("```", pending.end()) == -1:
+        return text[: pending.start()]
+    fence = text.rfind("```")
+    if fence != -1 and "\n" not in text[fence:] and text.count("```") % 2:
+        # Opening fence still on its first line — it may be a control block
+        return text[:fence]
+    return text
+
 
 class TelegramBot:
     """Telegram bot that connects the user to the local AI agent."""
@@ -39,6 +179,13 @@ class TelegramBot:
         self.app: Optional[Application] = None
         self.chat_id: Optional[int] = None  # Telegram chat ID for sending messages
         self.tui_callback = None  # Callback to send messages to TUI
+        # Allowed user IDs (None = allow anyone)
+        self._allowed: Optional[FrozenSet[int]] = config.telegram.allowed_users or None
+        # Turns waiting to run, as coroutine functions. Memory is one shared
+        # conversation, so every chat's turns run one at a time, in order
+        self._turns: asyncio.Queue = asyncio.Queue()
+        self._turn_worker: Optional[asyncio.Task] = None
+        self._cron_gate = asyncio.Semaphore(1)  # At most one cron-triggered reply at a time
 
     def _is_allowed(self, user_id: int) -> bool:
         """Check if a user is allowed to use the bot.
@@ -46,8 +193,16 @@ class TelegramBot:
         In single-user mode, everyone shares the same conversation.
         You can still restrict access using allowed_users in config.
         """
-        allowed = self.config.telegram.allowed_users
-        return not allowed or user_id in allowed
+        return self._allowed is None or user_id in self._allowed
+
+    async def _check_allowed(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Drop updates from users who aren't allowed, before any handler runs."""
+        if self._allowed is None:
+            return
+        user = update.effective_user
+        if user is None or not self._is_allowed(user.id):
+            logger.warning(f"Ignoring update from unauthorised user: {user.id if user else None}")
+            raise ApplicationHandlerStop
 
     def set_tui_callback(self, callback):
         """Set callback to send messages to TUI.
@@ -76,14 +231,84 @@ class TelegramBot:
 
         try:
             # Send message to Telegram, splitting if too long
-            for i in range(0, len(message), 4000):
-                await self.app.bot.send_message(
-                    chat_id=self.chat_id,
-                    text=message[i : i + 4000]
-                )
+            await self._send_chunked(self._send_to_chat, message)
         except Exception as e:
             logger.error(f"Failed to send message to Telegram: {e}")
 
+    async def _send_to_chat(self, text: str, **kwargs):
+        """Send a single message to the stored Telegram chat."""
+        await self.app.bot.send_message(chat_id=self.chat_id, text=text, **kwargs)
+
+    async def _send_chunked(self, send, text: str):
+        """Send text via send(chunk), split to fit Telegram's message limit.
+
+        Chunks go out one at a time: concurrent sends aren't guaranteed to
+        arrive in order, which would scramble the text.
+        """
+        for chunk in split_message(text):
+            await send(chunk)
+
+    async def _apply_parsed(self, parsed: dict) -> List[str]:
+        """Act on the blocks parsed from a response — create jobs, save files
+        and remember facts.
+
+        Returns:
+            Notice lines describing what was done, for the caller to send
+        """
+        notices = []
+
+        # Create jobs and save files concurrently; their records are
+        # committed together, with a single fsync
+        async with self.memory.transaction():
+            (scheduled, job_errors), filepaths = await asyncio.gather(
+                self.scheduler.add_jobs(parsed["cron_jobs"]),
+                self.workspace.save_files(parsed["save_blocks"]),
+            )
+
+        # Show validation errors if any
+        cron_errors = parsed["cron_errors"] + job_errors
+        if cron_errors:
+            notices.append(
+                "⚠️ Cron job errors:\n" + "\n".join(f"• {e}" for e in cron_errors)
+            )
+
+        for job_id, job in scheduled:
+            notices.append(
+                f"✅ Scheduled job #{job_id}: {job['task']}\n"
+                f"Schedule: `{job['schedule']}`"
+            )
+        for filepath in filepaths:
+            notices.append(f"💾 Saved `{filepath.name}` to workspace")
+
+        # Save memories
+        for fact in parsed["memory"]:
+            if await self.agent.save_to_memory(fact):
+                notices.append(f"🧠 Remembered: {fact}")
+
+        return notices
+
+    async def _send_notices(self, send, notices: List[str]):
+        """Send all notices for a turn as a single message via send(text, **kwargs).
+
+        Falls back to plain text if Telegram rejects the Markdown (e.g. an
+        unbalanced `_` in a remembered fact), and to chunked plain text if
+        the notices don't fit in one message.
+        """
+        if not notices:
+            return
+
+        text = "\n".join(notices)
+        if len(text) > MESSAGE_CHUNK_SIZE:
+            # Splitting could break Markdown entities, so send as plain text
+            await self._send_chunked(send, text)
+            return
+
+        try:
+            await send(text, parse_mode="Markdown")
+        except BadRequest as e:
+            logger.debug(f"Markdown rejected, sending notices as plain text: {e}")
+            await send(text)
+
     async def _send_message(self, message: str):
         """Send a message to the user. Used as the scheduler callback.
 
@@ -96,6 +321,24 @@ class TelegramBot:
 
         logger.info(f"Cron job triggered: {message}")
 
+        # Don't let cron replies pile up behind a slow model
+        if self._cron_gate.locked():
+            logger.warning(f"Skipping cron job, previous one still pending: {message}")
+            return
+
+        # Queued like a message, so it can't interleave with a chat turn
+        await self._cron_gate.acquire()
+        await self._queue_turn(functools.partial(self._run_cron_turn, message))
+
+    async def _run_cron_turn(self, message: str):
+        """Reply to a cron prompt as a queued turn, then let the next one in."""
+        try:
+            await self._reply_to_cron(message)
+        finally:
+            self._cron_gate.release()
+
+    async def _reply_to_cron(self, message: str):
+        """Generate a response to a cron prompt and send it to the stored chat."""
         # Store the prompt in history as a user message
         await self.memory.add_message("user", message)
 
@@ -105,56 +348,19 @@ class TelegramBot:
         # Get AI response
         response = await self.agent.chat(history)
 
-        # Parse for cron jobs (in case the AI creates new jobs)
-        cron_jobs, cron_errors = self.agent.parse_cron_blocks(response)
-
-        # Show validation errors if any
-        if cron_errors:
-            error_msg = "⚠️ Cron job errors:\n" + "\n".join(f"• {e}" for e in cron_errors)
-            await self.app.bot.send_message(chat_id=self.chat_id, text=error_msg)
+        # Parse all blocks in one pass (in case the AI creates new jobs)
+        parsed = await self.agent.parse_response(response)
 
-        # Create valid jobs
-        for job in cron_jobs:
-            job_id = await self.scheduler.add_job(
-                job["schedule"], job["task"], job["message"]
-            )
-            await self.app.bot.send_message(
-                chat_id=self.chat_id,
-                text=f"✅ Scheduled job #{job_id}: {job['task']}\n"
-                     f"Schedule: `{job['schedule']}`",
-                parse_mode="Markdown",
-            )
-
-        # Parse for file saves
-        save_blocks = self.agent.parse_save_blocks(response)
-        for block in save_blocks:
-            filepath = await self.workspace.save_file(
-                block["filename"], block["content"]
-            )
-            await self.app.bot.send_message(
-                chat_id=self.chat_id,
-                text=f"💾 Saved `{filepath.name}` to workspace",
-                parse_mode="Markdown",
-            )
+        # Create jobs, save files and memories — collecting one notice per action
+        notices = await self._apply_parsed(parsed)
 
-        # Parse for memory blocks
-        memory_blocks = self.agent.parse_memory_blocks(response)
-        for fact in memory_blocks:
-            if await self.agent.save_to_memory(fact):
-                await self.app.bot.send_message(
-                    chat_id=self.chat_id,
-                    text=f"🧠 Remembered: {fact}"
-                )
-
-        # Send the cleaned response
-        clean = self.agent.clean_response(response)
+        # Send the notices (as one message) alongside the cleaned response
+        sends = [self._send_notices(self._send_to_chat, notices)]
+        clean = parsed["clean"]
         if clean:
-            # Telegram has a 4096 char limit — split if needed
-            for i in range(0, len(clean), 4000):
-                await self.app.bot.send_message(
-                    chat_id=self.chat_id,
-                    text=clean[i : i + 4000]
-                )
+            sends.append(self._send_chunked(self._send_to_chat, clean))
+
+        await asyncio.gather(*sends)
 
         # Store assistant response
         await self.memory.add_message("assistant", response)
@@ -163,24 +369,14 @@ class TelegramBot:
 
     async def cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command."""
-        message = (
-            "🦞 *PiLobster is online!*\n\n"
-            "I'm your local AI assistant running on a Raspberry Pi.\n\n"
-            "Just send me a message to chat, or use:\n"
-            "/status — System status\n"
-            "/jobs — List scheduled tasks\n"
-            "/schedule — Create a cron job\n"
-            "/workspace — List generated files\n"
-            "/clear — Clear conversation history\n"
-            "/help — Show all commands"
-        )
+        message = _START_MESSAGE
         await update.message.reply_text(message, parse_mode="Markdown")
         await self._send_to_tui(message, is_user=False)
 
     async def cmd_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /status command."""
         jobs = await self.scheduler.list_jobs()
-        files = self.workspace.list_files()
+        file_count = await asyncio.to_thread(self.workspace.count_files)
 
         status = (
             f"🦞 *PiLobster Status*\n\n"
@@ -188,7 +384,7 @@ class TelegramBot:
             f"Host: `{self.config.ollama.host}`\n"
             f"Context: `{self.config.ollama.context_length}` tokens\n"
             f"Scheduled jobs: `{len(jobs)}`\n"
-            f"Workspace files: `{len(files)}`"
+            f"Workspace files: `{file_count}`"
         )
         await update.message.reply_text(status, parse_mode="Markdown")
         await self._send_to_tui(status, is_user=False)
@@ -202,14 +398,21 @@ class TelegramBot:
             await self._send_to_tui(message, is_user=False)
             return
 
-        lines = ["🕐 *Scheduled Jobs*\n"]
-        for job in jobs:
-            lines.append(f"#{job['id']} — {job['task']}\n  Schedule: `{job['schedule']}`")
-
-        message = "\n".join(lines)
-        await update.message.reply_text(message, parse_mode="Markdown")
+        message = "🕐 *Scheduled Jobs*\n\n" + "\n".join(
+            f"#{job['id']} — {job['task']}\n  Schedule: `{job['schedule']}`"
+            for job in jobs
+        )
+        await self._reply_listing(update, message)
         await self._send_to_tui(message, is_user=False)
 
+    async def _reply_listing(self, update: Update, message: str):
+        """Reply with a Markdown listing, chunked as plain text if too long."""
+        if len(message) > MESSAGE_CHUNK_SIZE:
+            # Splitting could break Markdown entities, so send as plain text
+            await self._send_chunked(update.message.reply_text, message)
+        else:
+            await update.message.reply_text(message, parse_mode="Markdown")
+
     async def cmd_cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /cancel <id> command — cancel a scheduled job."""
         if not context.args:
@@ -236,20 +439,15 @@ class TelegramBot:
 
     async def cmd_workspace(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /workspace command — list files in workspace."""
-        files = self.workspace.list_files()
+        files = await asyncio.to_thread(self.workspace.list_files_formatted)
         if not files:
             message = "Workspace is empty. Ask me to write some code!"
             await update.message.reply_text(message)
             await self._send_to_tui(message, is_user=False)
             return
 
-        lines = ["📁 *Workspace Files*\n"]
-        for f in files:
-            size_kb = f["size"] / 1024
-            lines.append(f"`{f['name']}` ({size_kb:.1f} KB)")
-
-        message = "\n".join(lines)
-        await update.message.reply_text(message, parse_mode="Markdown")
+        message = "📁 *Workspace Files*\n\n" + "\n".join(files)
+        await self._reply_listing(update, message)
         await self._send_to_tui(message, is_user=False)
 
     async def cmd_clear(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -263,10 +461,7 @@ class TelegramBot:
         """Handle /save command — manually save code from last response."""
         # Check if filename was provided
         if not context.args:
-            message = (
-                "Usage: `/save filename.py`\n"
-                "This will save the last code block from my response."
-            )
+            message = _SAVE_USAGE
             await update.message.reply_text(message, parse_mode="Markdown")
             await self._send_to_tui(message, is_user=False)
             return
@@ -309,20 +504,7 @@ class TelegramBot:
         """Handle /schedule command — manually create a cron job."""
         # Check if arguments were provided
         if not context.args or len(context.args) < 6:
-            message = (
-                "Usage: `/schedule <cron> <prompt>`\n\n"
-                "The prompt will be sent to me when the job triggers.\n\n"
-                "Cron format: `minute hour day month weekday`\n\n"
-                "Examples:\n"
-                "`/schedule */3 * * * * Tell me a joke`\n"
-                "`/schedule 0 9 * * * Give me a motivational quote`\n"
-                "`/schedule 30 14 * * 1-5 Remind me to stand up`\n\n"
-                "Common patterns:\n"
-                "• `*/5 * * * *` — Every 5 minutes\n"
-                "• `0 * * * *` — Every hour\n"
-                "• `0 9 * * *` — Daily at 9am\n"
-                "• `0 9 * * 1` — Every Monday at 9am"
-            )
+            message = _SCHEDULE_USAGE
             await update.message.reply_text(message, parse_mode="Markdown")
             await self._send_to_tui(message, is_user=False)
             return
@@ -371,24 +553,7 @@ class TelegramBot:
 
     async def cmd_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command."""
-        message = (
-            "🦞 *PiLobster Commands*\n\n"
-            "/start — Welcome message\n"
-            "/status — System status\n"
-            "/jobs — List scheduled tasks\n"
-            "/schedule <cron> <msg> — Create a cron job\n"
-            "/cancel <id> — Cancel a task\n"
-            "/workspace — List generated files\n"
-            "/save <filename> — Save last code block\n"
-            "/memory — View saved memories\n"
-            "/forget — Clear all memories\n"
-            "/clear — Clear chat history\n"
-            "/help — This message\n\n"
-            "*Natural Language:*\n"
-            "• Ask me to write code — I'll save it to the workspace\n"
-            "• Ask me to schedule something — I'll create a cron job\n"
-            "• Or just chat!"
-        )
+        message = _HELP_MESSAGE
         await update.message.reply_text(message, parse_mode="Markdown")
         await self._send_to_tui(message, is_user=False)
 
@@ -419,12 +584,60 @@ class TelegramBot:
     # --- Message Handler ---
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle incoming text messages — the main chat loop."""
+        """Handle incoming text messages — queue them as a turn.
+
+        Returns immediately so the update loop stays responsive while the
+        model is thinking. Turns are processed in order, one at a time.
+        """
+        chat_id = update.effective_chat.id
+
         # Store chat_id for later use (for sending messages from TUI)
         if self.chat_id is None:
-            self.chat_id = update.effective_chat.id
+            self.chat_id = chat_id
             logger.info(f"Stored Telegram chat_id: {self.chat_id}")
 
+        await self._queue_turn(functools.partial(self._process_message, update))
+
+    def _queued(self, handler):
+        """Wrap a command handler so it runs as a queued turn."""
+        async def queue_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            await self._queue_turn(functools.partial(handler, update, context))
+
+        return queue_command
+
+    async def _queue_turn(self, turn):
+        """Queue turn() to run after earlier turns, starting the worker if needed."""
+        if self._turn_worker is None:
+            self._turn_worker = asyncio.create_task(self._run_turns())
+        await self._turns.put(turn)
+
+    async def _run_turns(self):
+        """Run queued turns one at a time, oldest first."""
+        while True:
+            turn = await self._turns.get()
+            try:
+                await turn()
+            except Exception as e:
+                logger.error(f"Error processing message: {e}")
+            finally:
+                self._turns.task_done()
+
+    async def _stop_turn_worker(self):
+        """Cancel the turn worker, abandoning any queued turns."""
+        if self._turn_worker is None:
+            return
+        dropped = self._turns.qsize()
+        self._turn_worker.cancel()
+        try:
+            await self._turn_worker
+        except asyncio.CancelledError:
+            pass
+        self._turn_worker = None
+        if dropped:
+            logger.warning(f"Dropped {dropped} queued message(s) on shutdown")
+
+    async def _process_message(self, update: Update):
+        """Run a message through the agent — the main chat loop."""
         user_text = update.message.text
         logger.info(f"Message received: {user_text[:80]}...")
 
@@ -441,106 +654,137 @@ class TelegramBot:
         await update.message.chat.send_action("typing")
 
         # Get AI response
-        response = await self.agent.chat(history)
+        reply, response = await self._stream_reply(update, history)
 
-        # Parse for cron jobs
-        cron_jobs, cron_errors = self.agent.parse_cron_blocks(response)
-
-        # Show validation errors if any
-        if cron_errors:
-            error_msg = "⚠️ Cron job errors:\n" + "\n".join(f"• {e}" for e in cron_errors)
-            await update.message.reply_text(error_msg)
-
-        # Create valid jobs
-        for job in cron_jobs:
-            job_id = await self.scheduler.add_job(
-                job["schedule"], job["task"], job["message"]
-            )
-            await update.message.reply_text(
-                f"✅ Scheduled job #{job_id}: {job['task']}\n"
-                f"Schedule: `{job['schedule']}`",
-                parse_mode="Markdown",
-            )
+        # Parse all blocks in one pass
+        parsed = await self.agent.parse_response(response)
 
-        # Parse for file saves
-        save_blocks = self.agent.parse_save_blocks(response)
-        for block in save_blocks:
-            filepath = await self.workspace.save_file(
-                block["filename"], block["content"]
-            )
-            await update.message.reply_text(
-                f"💾 Saved `{filepath.name}` to workspace",
-                parse_mode="Markdown",
-            )
+        # Replace the streamed text with the cleaned response
+        clean = parsed["clean"]
+        chunks = split_message(clean) if clean else []
+        if chunks:
+            await self._edit_reply(reply, chunks[0])
+        else:
+            await self._delete_reply(reply)
+        # Telegram has a 4096 char limit — send any overflow as follow-ups.
+        # Chunks stay sequential so they arrive in reading order.
+        for chunk in chunks[1:]:
+            await update.message.reply_text(chunk)
 
-        # Parse for memory blocks
-        memory_blocks = self.agent.parse_memory_blocks(response)
-        for fact in memory_blocks:
-            if await self.agent.save_to_memory(fact):
-                await update.message.reply_text(f"🧠 Remembered: {fact}")
+        # Create jobs, save files and memories — collecting one notice per action
+        notices = await self._apply_parsed(parsed)
 
         # Check if memory is getting too large
         is_large, line_count = self.agent.check_memory_size()
         if is_large:
-            await update.message.reply_text(
+            notices.append(
                 f"⚠️ Your memory file is getting large ({line_count} lines).\n"
-                f"Consider using `/forget` to clear old memories.",
-                parse_mode="Markdown",
+                f"Consider using `/forget` to clear old memories."
             )
 
-        # Send the cleaned response
-        clean = self.agent.clean_response(response)
+        # Send all notices for this turn as a single message
+        await self._send_notices(update.message.reply_text, notices)
+
+        # Send the cleaned response to TUI
         if clean:
-            # Send to TUI
             await self._send_to_tui(clean, is_user=False)
-            # Telegram has a 4096 char limit — split if needed
-            for i in range(0, len(clean), 4000):
-                await update.message.reply_text(clean[i : i + 4000])
 
         # Store assistant response
         await self.memory.add_message("assistant", response)
 
+    async def _stream_reply(self, update: Update, history: List[dict]) -> Tuple[Message, str]:
+        """Stream the model's response into a reply, editing it as text arrives.
+
+        Returns (reply, response) — the partially rendered reply message for
+        the caller to finalise, and the full response text.
+        """
+        loop = asyncio.get_running_loop()
+        reply = await update.message.reply_text("…")
+        parts = []
+        shown = ""
+        last_edit = loop.time()
+
+        async for piece in self.agent.chat_stream(history):
+            parts.append(piece)
+            if loop.time() - last_edit >= STREAM_EDIT_INTERVAL:
+                partial = cut_pending_block("".join(parts))
+                text = self.agent.clean_response(partial)[:MESSAGE_CHUNK_SIZE].strip()
+                if text and text != shown:
+                    await self._edit_reply(reply, text + " …")
+                    shown = text
+                last_edit = loop.time()
+
+        return reply, "".join(parts)
+
+    async def _edit_reply(self, message: Message, text: str):
+        """Edit a sent message, ignoring failures such as unchanged text."""
+        try:
+            await message.edit_text(text)
+        except Exception as e:
+            logger.debug(f"Failed to edit message: {e}")
+
+    async def _delete_reply(self, message: Message):
+        """Delete a sent message, ignoring failures."""
+        try:
+            await message.delete()
+        except Exception as e:
+            logger.debug(f"Failed to delete message: {e}")
+
     # --- Bot Lifecycle ---
 
+    async def post_stop(self, app: Application):
+        """Called once the bot has stopped — stop processing queued turns."""
+        await self._stop_turn_worker()
+
     async def post_init(self, app: Application):
         """Called after the bot is initialised — set up commands menu."""
-        commands = [
-            BotCommand("start", "Welcome message"),
-            BotCommand("status", "System status"),
-            BotCommand("jobs", "List scheduled tasks"),
-            BotCommand("schedule", "Create a cron job"),
-            BotCommand("cancel", "Cancel a scheduled task"),
-            BotCommand("workspace", "List generated files"),
-            BotCommand("save", "Save last code block"),
-            BotCommand("memory", "View saved memories"),
-            BotCommand("forget", "Clear all memories"),
-            BotCommand("clear", "Clear chat history"),
-            BotCommand("help", "Show commands"),
-        ]
-        await app.bot.set_my_commands(commands)
+        # The menu rarely changes — only register it when it (or the bot) has
+        # changed since the last run
+        digest = hashlib.blake2b(
+            repr((self.config.telegram.token, _COMMANDS)).encode(), digest_size=8
+        ).hexdigest()
+        try:
+            if COMMANDS_HASH_FILE.read_text() == digest:
+                logger.info("Bot commands menu unchanged")
+                return
+        except OSError:
+            pass
+
+        await app.bot.set_my_commands(_BOT_COMMANDS)
         logger.info("Bot commands menu registered")
 
+        try:
+            COMMANDS_HASH_FILE.parent.mkdir(parents=True, exist_ok=True)
+            COMMANDS_HASH_FILE.write_text(digest)
+        except OSError as e:
+            logger.debug(f"Failed to cache commands hash: {e}")
+
     def build(self) -> Application:
         """Build the Telegram application with all handlers."""
         self.app = (
             Application.builder()
             .token(self.config.telegram.token)
+            # HTTP/2 multiplexes concurrent sends over one TLS connection
+            .http_version("2")
+            .get_updates_http_version("2")
             .post_init(self.post_init)
+            .post_stop(self.post_stop)
+            # Let read-only commands run while another update is waiting on
+            # I/O; messages and state-changing commands keep their order via
+            # the turn queue
+            .concurrent_updates(True)
             .build()
         )
 
+        # Check permissions first (group -1 runs before all other handlers)
+        self.app.add_handler(TypeHandler(Update, self._check_allowed), group=-1)
+
         # Register command handlers
-        self.app.add_handler(CommandHandler("start", self.cmd_start))
-        self.app.add_handler(CommandHandler("status", self.cmd_status))
-        self.app.add_handler(CommandHandler("jobs", self.cmd_jobs))
-        self.app.add_handler(CommandHandler("schedule", self.cmd_schedule))
-        self.app.add_handler(CommandHandler("cancel", self.cmd_cancel))
-        self.app.add_handler(CommandHandler("workspace", self.cmd_workspace))
-        self.app.add_handler(CommandHandler("save", self.cmd_save))
-        self.app.add_handler(CommandHandler("memory", self.cmd_memory))
-        self.app.add_handler(CommandHandler("forget", self.cmd_forget))
-        self.app.add_handler(CommandHandler("clear", self.cmd_clear))
-        self.app.add_handler(CommandHandler("help", self.cmd_help))
+        for name, handler, _ in _COMMANDS:
+            callback = getattr(self, handler)
+            if name in _QUEUED_COMMANDS:
+                callback = self._queued(callback)
+            self.app.add_handler(CommandHandler(name, callback))
 
         # Register message handler (must be last)
         self.app.add_handler(
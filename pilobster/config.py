@@ -3,47 +3,57 @@
 import yaml
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import List
+from typing import FrozenSet
 
+# Use the LibYAML-backed loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-@dataclass
+
+@dataclass(slots=True)
 class TelegramConfig:
     token: str = ""
-    allowed_users: List[int] = field(default_factory=list)
+    allowed_users: FrozenSet[int] = field(default_factory=frozenset)
 
 
-@dataclass
+@dataclass(slots=True)
 class OllamaConfig:
     host: str = "http://localhost:11434"
     model: str = "tinyllama"
     keep_alive: int = -1
     context_length: int = 4096
     temperature: float = 0.7
+    max_concurrent: int = 4
 
 
-@dataclass
+@dataclass(slots=True)
 class WorkspaceConfig:
     path: str = "./workspace"
 
 
-@dataclass
+@dataclass(slots=True)
 class SchedulerConfig:
     enabled: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class MemoryConfig:
     database: str = "./pilobster.db"
     max_history: int = 50
 
 
-@dataclass
+@dataclass(slots=True)
+class TuiConfig:
+    max_log_lines: int = 2000
+
+
+@dataclass(slots=True)
 class Config:
     telegram: TelegramConfig = field(default_factory=TelegramConfig)
     ollama: OllamaConfig = field(default_factory=OllamaConfig)
     workspace: WorkspaceConfig = field(default_factory=WorkspaceConfig)
     scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
     memory: MemoryConfig = field(default_factory=MemoryConfig)
+    tui: TuiConfig = field(default_factory=TuiConfig)
     system_prompt: str = "You are PiLobster, a helpful AI assistant."
 
 
@@ -57,12 +67,14 @@ def load_config(path: str = "config.yaml") -> Config:
         )
 
     with open(config_path) as f:
-        raw = yaml.safe_load(f)
+        raw = yaml.load(f, Loader=_YAML_LOADER)
 
     config = Config()
 
     if "telegram" in raw:
         config.telegram = TelegramConfig(**raw["telegram"])
+        # Stored as a set so permission checks are O(1) lookups
+        config.telegram.allowed_users = frozenset(config.telegram.allowed_users or ())
     if "ollama" in raw:
         config.ollama = OllamaConfig(**raw["ollama"])
     if "workspace" in raw:
@@ -71,6 +83,8 @@ def load_config(path: str = "config.yaml") -> Config:
         config.scheduler = SchedulerConfig(**raw["scheduler"])
     if "memory" in raw:
         config.memory = MemoryConfig(**raw["memory"])
+    if "tui" in raw:
+        config.tui = TuiConfig(**raw["tui"])
 
     # Load system prompt from soul.md or config.yaml (fallback)
     if "system_prompt" in raw:
@@ -1,11 +1,27 @@
 """Persistent memory using SQLite for conversation history and cron jobs."""
 
-import aiosqlite
-import json
-from datetime import datetime
-from pathlib import Path
+import asyncio
+import contextlib
+import contextvars
+import logging
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List
 
+logger = logging.getLogger("pilobster.memory")
+
+# Write-behind settings for conversation inserts
+WRITE_BATCH_SIZE = 32  # Max messages committed in one transaction
+WRITE_BATCH_DELAY = 0.05  # Seconds to wait for more messages to join a batch
+
+# The Memory whose transaction() block the current task is in. A context
+# variable, so tasks started inside the block (e.g. by gather) belong to it
+# while unrelated tasks don't
+_current_transaction: contextvars.ContextVar = contextvars.ContextVar(
+    "pilobster_memory_transaction", default=None
+)
+
 
 class Memory:
     """SQLite-backed storage for conversations, cron jobs, and notes."""
@@ -15,12 +31,35 @@ class Memory:
 
     def __init__(self, db_path: str = "./pilobster.db"):
         self.db_path = db_path
-        self.db: Optional[aiosqlite.Connection] = None
+        self.db: Optional[sqlite3.Connection] = None
+        # All database work runs on this one thread, so the connection is
+        # only ever used from the thread that created it
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pilobster-db")
+        # Recent conversation kept in RAM (oldest first), loaded on first read
+        self._history: Optional[deque] = None
+        # Held while the window is reloaded (or cleared), so a message added
+        # meanwhile lands in the new window instead of the discarded one
+        self._history_lock = asyncio.Lock()
+        # Conversation inserts are queued and committed in batches by _writer
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Held by an open transaction() block, and by each write made outside
+        # one — so other tasks' writes can't land in the block's transaction
+        self._write_lock = asyncio.Lock()
+        # Queues notified of every new conversation message (see subscribe)
+        self._subscribers: List[asyncio.Queue] = []
 
     async def connect(self):
         """Initialise the database and create tables."""
-        self.db = await aiosqlite.connect(self.db_path)
-        await self.db.executescript("""
+        self.db = await self._run(sqlite3.connect, self.db_path)
+        await self._run(self.db.executescript, """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            PRAGMA temp_store = MEMORY;
+            PRAGMA mmap_size = 67108864;
+            PRAGMA cache_size = -20000;
+            PRAGMA busy_timeout = 5000;
+
             CREATE TABLE IF NOT EXISTS conversations (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id INTEGER NOT NULL,
@@ -39,6 +78,12 @@ class Memory:
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             );
 
+            CREATE INDEX IF NOT EXISTS idx_conversations_user
+                ON conversations (user_id, id);
+
+            CREATE INDEX IF NOT EXISTS idx_cron_jobs_user_enabled
+                ON cron_jobs (user_id, enabled);
+
             CREATE TABLE IF NOT EXISTS workspace_files (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 filename TEXT NOT NULL,
@@ -46,61 +91,240 @@ class Memory:
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             );
         """)
-        await self.db.commit()
+        await self._run(self.db.commit)
+
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer())
 
     async def close(self):
-        """Close the database connection."""
+        """Flush pending writes and close the database connection."""
+        if self._writer_task:
+            await self.flush()
+            self._writer_task.cancel()
+            self._writer_task = None
         if self.db:
-            await self.db.close()
+            await self._run(self.db.close)
+            self.db = None
+        self._executor.shutdown(wait=False)
 
-    # --- Conversation History ---
+    async def _run(self, fn, *args):
+        """Run a blocking database call on the database thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def _execute(self, sql: str, params: tuple = (), commit: bool = False) -> sqlite3.Cursor:
+        """Execute a statement — and optionally commit — in one thread hop."""
+        def execute():
+            cursor = self.db.execute(sql, params)
+            if commit:
+                self.db.commit()
+            return cursor
+
+        return await self._run(execute)
+
+    async def _fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Run a query and return all rows, in one thread hop."""
+        return await self._run(lambda: self.db.execute(sql, params).fetchall())
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Make the writes inside the block atomic: all committed, or none.
+
+        Writes still execute immediately (so e.g. new job IDs are available),
+        but are committed — with a single fsync — when the block exits, or
+        rolled back if it raises. Writes from other tasks wait until then.
+        Nested blocks join the outer one.
+
+        Don't add messages or read uncached history inside the block: those
+        wait on the background writer, which waits for the block.
+        """
+        if _current_transaction.get() is self:
+            yield
+            return
+
+        async with self._write_lock:
+            token = _current_transaction.set(self)
+            try:
+                yield
+            except BaseException:
+                await self._run(self.db.rollback)
+                raise
+            else:
+                await self._run(self.db.commit)
+            finally:
+                _current_transaction.reset(token)
+
+    @contextlib.asynccontextmanager
+    async def _write(self):
+        """Hold write access for a change; yields whether to commit it.
+
+        Inside this task's transaction() block, the block commits instead.
+        Outside one, waits for any open block, and rolls back on failure
+        so a half-done write isn't committed by the next one.
+        """
+        if _current_transaction.get() is self:
+            yield False
+            return
+
+        async with self._write_lock:
+            try:
+                yield True
+            except BaseException:
+                await self._run(self.db.rollback)
+                raise
+
+    async def flush(self):
+        """Wait until all queued conversation messages are committed."""
+        if self._write_queue is not None:
+            await self._write_queue.join()
+
+    async def _writer(self):
+        """Commit queued conversation messages in batches (write-behind)."""
+        while True:
+            batch = [await self._write_queue.get()]
+            # Give closely spaced messages a moment to join the same transaction
+            await asyncio.sleep(WRITE_BATCH_DELAY)
+            while len(batch) < WRITE_BATCH_SIZE and not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+
+            try:
+                async with self._write():
+                    await self._run(self._insert_messages, batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} message(s): {e}")
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
 
-    async def add_message(self, role: str, content: str):
-        """Store a conversation message."""
-        await self.db.execute(
+    def _insert_messages(self, batch: List[tuple]):
+        """Insert and commit a batch of conversation rows (database thread)."""
+        self.db.executemany(
             "INSERT INTO conversations (user_id, role, content) VALUES (?, ?, ?)",
-            (self.USER_ID, role, content),
+            batch,
         )
-        await self.db.commit()
+        self.db.commit()
+
+    # --- Conversation History ---
+
+    def subscribe(self) -> asyncio.Queue:
+        """Get a queue that receives every conversation message added from now on.
+
+        Items are dicts with "role", "content" and "source" keys, where
+        source is whatever the writer passed to add_message.
+        """
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Stop delivering messages to a queue from subscribe()."""
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    async def add_message(self, role: str, content: str, source: str = ""):
+        """Store a conversation message.
+
+        The insert is queued for the background writer; the in-memory
+        history is updated and subscribers are notified immediately.
+        """
+        async with self._history_lock:
+            await self._write_queue.put((self.USER_ID, role, content))
+            if self._history is not None:
+                self._history.append({"role": role, "content": content})
+        for queue in self._subscribers:
+            queue.put_nowait({"role": role, "content": content, "source": source})
 
     async def get_history(self, limit: int = 50) -> List[dict]:
-        """Retrieve recent conversation history."""
-        cursor = await self.db.execute(
-            "SELECT role, content FROM conversations "
-            "WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+        """Retrieve recent conversation history.
+
+        Served from an in-memory window; the database is only queried the
+        first time, or when a larger window than the cached one is requested.
+        """
+        if self._history is None or limit > self._history.maxlen:
+            async with self._history_lock:
+                # Another task may have reloaded while this one waited
+                if self._history is None or limit > self._history.maxlen:
+                    await self._reload_history(limit)
+
+        history = list(self._history)
+        return history[-limit:] if limit < len(history) else history
+
+    async def _reload_history(self, limit: int):
+        """Replace the in-memory window with the newest `limit` stored messages.
+
+        Call with _history_lock held, so no message is added between the
+        read and the swap.
+        """
+        await self.flush()
+        # Newest `limit` rows, returned oldest first
+        rows = await self._fetchall(
+            "SELECT role, content FROM ("
+            "SELECT id, role, content FROM conversations "
+            "WHERE user_id = ? ORDER BY id DESC LIMIT ?"
+            ") ORDER BY id",
             (self.USER_ID, limit),
         )
-        rows = await cursor.fetchall()
-        # Reverse so oldest messages come first
-        return [{"role": row[0], "content": row[1]} for row in reversed(rows)]
+        self._history = deque(
+            ({"role": row[0], "content": row[1]} for row in rows),
+            maxlen=limit,
+        )
 
     async def clear_history(self):
         """Clear conversation history."""
-        await self.db.execute(
-            "DELETE FROM conversations WHERE user_id = ?", (self.USER_ID,)
-        )
-        await self.db.commit()
+        async with self._history_lock:
+            # Don't let queued inserts land after the delete
+            await self.flush()
+            async with self._write() as commit:
+                await self._execute(
+                    "DELETE FROM conversations WHERE user_id = ?", (self.USER_ID,), commit=commit
+                )
+            if self._history is not None:
+                self._history.clear()
 
     # --- Cron Jobs ---
 
     async def add_cron_job(self, schedule: str, task: str, message: str) -> int:
         """Add a new cron job. Returns the job ID."""
-        cursor = await self.db.execute(
-            "INSERT INTO cron_jobs (user_id, schedule, task, message) "
-            "VALUES (?, ?, ?, ?)",
-            (self.USER_ID, schedule, task, message),
-        )
-        await self.db.commit()
+        async with self._write() as commit:
+            cursor = await self._execute(
+                "INSERT INTO cron_jobs (user_id, schedule, task, message) "
+                "VALUES (?, ?, ?, ?)",
+                (self.USER_ID, schedule, task, message),
+                commit=commit,
+            )
         return cursor.lastrowid
 
+    async def add_cron_jobs(self, jobs: List[tuple]) -> List[int]:
+        """Add several cron jobs in one commit.
+
+        Args:
+            jobs: (schedule, task, message) tuples
+
+        Returns: the new job IDs, in order
+        """
+        def insert(commit: bool) -> List[int]:
+            ids = [
+                self.db.execute(
+                    "INSERT INTO cron_jobs (user_id, schedule, task, message) "
+                    "VALUES (?, ?, ?, ?)",
+                    (self.USER_ID, *job),
+                ).lastrowid
+                for job in jobs
+            ]
+            if commit:
+                self.db.commit()
+            return ids
+
+        async with self._write() as commit:
+            return await self._run(insert, commit)
+
     async def get_cron_jobs(self) -> List[dict]:
         """Get all cron jobs."""
-        cursor = await self.db.execute(
+        rows = await self._fetchall(
             "SELECT id, user_id, schedule, task, message, enabled "
             "FROM cron_jobs WHERE user_id = ? AND enabled = 1",
             (self.USER_ID,),
         )
-        rows = await cursor.fetchall()
         return [
             {
                 "id": row[0],
@@ -115,29 +339,29 @@ class Memory:
 
     async def disable_cron_job(self, job_id: int) -> bool:
         """Disable a cron job. Returns True if found."""
-        cursor = await self.db.execute(
-            "UPDATE cron_jobs SET enabled = 0 WHERE id = ?", (job_id,)
-        )
-        await self.db.commit()
+        async with self._write() as commit:
+            cursor = await self._execute(
+                "UPDATE cron_jobs SET enabled = 0 WHERE id = ?", (job_id,), commit=commit
+            )
         return cursor.rowcount > 0
 
     # --- Workspace Files ---
 
     async def log_file(self, filename: str, description: str = ""):
         """Log a file created in the workspace."""
-        await self.db.execute(
-            "INSERT INTO workspace_files (filename, description) VALUES (?, ?)",
-            (filename, description),
-        )
-        await self.db.commit()
+        async with self._write() as commit:
+            await self._execute(
+                "INSERT INTO workspace_files (filename, description) VALUES (?, ?)",
+                (filename, description),
+                commit=commit,
+            )
 
     async def get_workspace_files(self) -> List[dict]:
         """List all files logged in the workspace."""
-        cursor = await self.db.execute(
+        rows = await self._fetchall(
             "SELECT filename, description, created_at FROM workspace_files "
             "ORDER BY created_at DESC"
         )
-        rows = await cursor.fetchall()
         return [
             {"filename": row[0], "description": row[1], "created_at": row[2]}
             for row in rows
@@ -1,7 +1,10 @@
 """Cron scheduler — runs recurring tasks via APScheduler."""
 
+import asyncio
+import functools
 import logging
-from typing import List, Callable, Awaitable
+import re
+from typing import List, Callable, Awaitable, Tuple
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
@@ -9,13 +12,49 @@ from .memory import Memory
 
 logger = logging.getLogger("pilobster.scheduler")
 
+# Seconds a job may fire late (e.g. while the loop is busy) before it's skipped
+MISFIRE_GRACE_TIME = 300
+
+# Characters allowed in a cron field: numbers, names (mon, jan), * , / -
+_CRON_FIELD_RE = re.compile(r"[\w*,/-]+")
+
+
+@functools.lru_cache(maxsize=256)
+def _make_trigger(schedule: str) -> CronTrigger:
+    """Build a CronTrigger from a 5-field cron expression.
+
+    Cached by schedule string — triggers hold no firing state, so jobs
+    with the same schedule can share one.
+
+    Raises ValueError if the expression is invalid.
+    """
+    parts = schedule.split()
+    if len(parts) != 5:
+        raise ValueError(f"expected 5 fields, got {len(parts)}")
+    # Reject obvious junk before APScheduler's (much slower) field parser
+    for part in parts:
+        if not _CRON_FIELD_RE.fullmatch(part):
+            raise ValueError(f"invalid field '{part}'")
+
+    return CronTrigger(
+        minute=parts[0],
+        hour=parts[1],
+        day=parts[2],
+        month=parts[3],
+        day_of_week=parts[4],
+    )
+
 
 class Scheduler:
     """Manages cron jobs that send messages back to users via Telegram."""
 
     def __init__(self, memory: Memory):
         self.memory = memory
-        self.apscheduler = AsyncIOScheduler()
+        # Late jobs still run (once, if several runs were missed) rather than
+        # being dropped after APScheduler's default 1 second grace period
+        self.apscheduler = AsyncIOScheduler(
+            job_defaults={"coalesce": True, "misfire_grace_time": MISFIRE_GRACE_TIME}
+        )
         self._send_callbacks = []
 
     def set_send_callback(self, callback: Callable[[str], Awaitable[None]]):
@@ -41,7 +80,11 @@ class Scheduler:
         logger.info(f"Loaded {len(jobs)} cron job(s) from database")
 
     async def add_job(self, schedule: str, task: str, message: str) -> int:
-        """Add a new cron job and schedule it."""
+        """Add a new cron job and schedule it.
+
+        Raises ValueError if the schedule is invalid (nothing is stored).
+        """
+        _make_trigger(schedule)  # Validate first; the trigger is cached for below
         job_id = await self.memory.add_cron_job(schedule, task, message)
         job = {
             "id": job_id,
@@ -54,6 +97,41 @@ class Scheduler:
         logger.info(f"Added cron job #{job_id}: '{task}' ({schedule})")
         return job_id
 
+    async def add_jobs(self, jobs: List[dict]) -> Tuple[List[Tuple[int, dict]], List[str]]:
+        """Add and schedule several cron jobs, storing them in one commit.
+
+        Each job dict needs "schedule", "task" and "message" keys. Schedules
+        are validated first; invalid jobs are reported, not stored.
+
+        Returns: (scheduled, errors) — (job_id, job) pairs in order, and one
+        message per rejected job
+        """
+        valid = []
+        errors = []
+        for job in jobs:
+            try:
+                _make_trigger(job["schedule"])
+            except ValueError as e:
+                errors.append(f"Invalid cron schedule '{job['schedule']}': {e}")
+            else:
+                valid.append(job)
+        if not valid:
+            return [], errors
+
+        job_ids = await self.memory.add_cron_jobs(
+            [(job["schedule"], job["task"], job["message"]) for job in valid]
+        )
+        for job_id, job in zip(job_ids, valid):
+            self._add_apscheduler_job({
+                "id": job_id,
+                "user_id": self.memory.USER_ID,
+                "schedule": job["schedule"],
+                "task": job["task"],
+                "message": job["message"],
+            })
+            logger.info(f"Added cron job #{job_id}: '{job['task']}' ({job['schedule']})")
+        return list(zip(job_ids, valid)), errors
+
     async def cancel_job(self, job_id: int) -> bool:
         """Cancel a cron job by ID."""
         success = await self.memory.disable_cron_job(job_id)
@@ -72,19 +150,12 @@ class Scheduler:
     def _add_apscheduler_job(self, job: dict):
         """Register a job with APScheduler."""
         try:
-            parts = job["schedule"].split()
-            if len(parts) != 5:
-                logger.warning(f"Invalid cron schedule for job #{job['id']}: {job['schedule']}")
-                return
-
-            trigger = CronTrigger(
-                minute=parts[0],
-                hour=parts[1],
-                day=parts[2],
-                month=parts[3],
-                day_of_week=parts[4],
-            )
+            trigger = _make_trigger(job["schedule"])
+        except ValueError as e:
+            logger.warning(f"Invalid cron schedule for job #{job['id']}: {job['schedule']} ({e})")
+            return
 
+        try:
             self.apscheduler.add_job(
                 self._execute_job,
                 trigger=trigger,
@@ -96,14 +167,22 @@ class Scheduler:
             logger.error(f"Failed to schedule job #{job['id']}: {e}")
 
     async def _execute_job(self, message: str):
-        """Execute a cron job by sending a message to all registered callbacks."""
+        """Execute a cron job by sending a message to all registered callbacks.
+
+        Callbacks run concurrently, so e.g. Telegram and the TUI don't wait
+        on each other.
+        """
         if self._send_callbacks:
-            for callback in self._send_callbacks:
-                try:
-                    await callback(message)
+            callbacks = list(self._send_callbacks)
+            results = await asyncio.gather(
+                *(callback(message) for callback in callbacks),
+                return_exceptions=True,
+            )
+            for callback, result in zip(callbacks, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to send cron message via {callback.__name__}: {result}")
+                else:
                     logger.debug(f"Cron job sent message via {callback.__name__}")
-                except Exception as e:
-                    logger.error(f"Failed to send cron message via {callback.__name__}: {e}")
         else:
             logger.warning("No send callbacks registered — cron message dropped")
 
@@ -1,13 +1,17 @@
 """Terminal UI for PiLobster using Textual."""
 
 import asyncio
+import functools
+import io
 import logging
-from datetime import datetime
-from typing import Optional
+import re
+from typing import List, Optional, Tuple
 from textual.app import App, ComposeResult
 from textual.widgets import Header, Static, Input, RichLog
 from textual.binding import Binding
+from rich.console import Console, Group
 from rich.markdown import Markdown
+from rich.segment import Segments
 from rich.text import Text
 
 from .config import Config
@@ -18,6 +22,112 @@ from .workspace import Workspace
 
 logger = logging.getLogger("pilobster.tui")
 
+REPLAY_MESSAGES = 20  # Previous messages shown when the TUI starts
+
+# Markdown syntax: inline markup characters anywhere, or a block marker
+# (heading, quote, list item, table row) at the start. Streamed reply blocks
+# after the first have no "• " prefix, so e.g. "## Step 1" or "1. Install it"
+# arrive on their own and must still go through Markdown. Text matching
+# neither (e.g. "• ✅ Cancelled job") renders the same as plain Text
+_MARKDOWN_SYNTAX_RE = re.compile(r"[`*_#|\[\]<>&~\\\n]|^\s*(?:[-+]|\d+[.)])")
+
+
+# Static command replies, built once at import
+_HELP_TEXT = """**Available Commands:**
+
+- `/quit` or `/exit` — Exit PiLobster
+- `/clear` — Clear chat history
+- `/status` — Show system status
+- `/jobs` — List scheduled cron jobs
+- `/schedule <cron> <message>` — Create a cron job
+- `/cancel <id>` — Cancel a cron job
+- `/workspace` — List workspace files
+- `/save <filename>` — Save last code block
+- `/memory` — View saved memories
+- `/forget` — Clear all memories
+- `/help` — Show this help message
+
+**Keyboard Shortcuts:**
+- `Ctrl+C` — Quit
+- `Ctrl+L` — Clear history
+- `Ctrl+S` — Show status"""
+
+_SCHEDULE_USAGE = """**Usage:** `/schedule <cron> <prompt>`
+
+The prompt will be sent to me when the job triggers.
+
+**Cron format:** `minute hour day month weekday`
+
+**Examples:**
+- `/schedule */3 * * * * Tell me a joke`
+- `/schedule 0 9 * * * Give me a motivational quote`
+- `/schedule 30 14 * * 1-5 Remind me to stand up`
+
+**Common patterns:**
+- `*/5 * * * *` — Every 5 minutes
+- `0 * * * *` — Every hour
+- `0 9 * * *` — Daily at 9am
+- `0 9 * * 1` — Every Monday at 9am"""
+
+# Slash commands and the PiLobsterTUI methods that handle them
+_COMMANDS = {
+    "/quit": "cmd_quit",
+    "/exit": "cmd_quit",
+    "/clear": "cmd_clear",
+    "/status": "cmd_status",
+    "/jobs": "cmd_jobs",
+    "/schedule": "cmd_schedule",
+    "/cancel": "cmd_cancel",
+    "/workspace": "cmd_workspace",
+    "/save": "cmd_save",
+    "/memory": "cmd_memory",
+    "/forget": "cmd_forget",
+    "/help": "cmd_help",
+}
+
+
+def split_complete_blocks(text: str) -> Tuple[List[str], str]:
+    """Split streamed Markdown into finished blocks and an unfinished tail.
+
+    A block is finished by a blank line outside a code fence, or by the
+    closing line of a fence. Finished blocks won't change as more text
+    streams in, so each can be rendered once.
+
+    Returns: (completed blocks, tail still being written)
+    """
+    blocks = []
+    start = 0
+    pos = 0
+    in_fence = False
+    for line in text.splitlines(keepends=True):
+        if not line.endswith("\n"):
+            break  # Incomplete last line — part of the tail
+        end = pos + len(line)
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+            if not in_fence:
+                # Closing fence ends the block
+                blocks.append(text[start:end])
+                start = end
+        elif not in_fence and not line.strip():
+            if text[start:pos].strip():
+                blocks.append(text[start:pos])
+            start = end
+        pos = end
+    return blocks, text[start:]
+
+
+@functools.lru_cache(maxsize=64)
+def _render_markdown(markdown: str, width: int) -> Segments:
+    """Render Markdown to styled segments at the given width.
+
+    Pure CPU work with no app state, so it can run in a worker thread.
+    Cached by (markdown, width) so repeated messages render once.
+    """
+    console = Console(file=io.StringIO(), width=width)
+    lines = console.render_lines(Markdown(markdown), pad=False, new_lines=True)
+    return Segments([segment for line in lines for segment in line])
+
 
 class PiLobsterTUI(App):
     """A Textual TUI for PiLobster AI assistant."""
@@ -74,57 +184,122 @@ class PiLobsterTUI(App):
         self.memory = memory
         self.scheduler = scheduler
         self.workspace = workspace
-        self.processing = False
         self.title = "🦞 PiLobster"
         self.sub_title = "Local AI Assistant"
         self.telegram_callback = None  # Callback to send messages to Telegram
-        self.last_message_count = 0  # Track messages for sync
+        self._new_messages: Optional[asyncio.Queue] = None  # Messages from other interfaces
+        self._chat_log: Optional[RichLog] = None  # Looked up once in on_mount
+        # Messages waiting for a reply, as (text, from_cron); one worker
+        # drains them in order so model calls never overlap
+        self._turns: asyncio.Queue = asyncio.Queue()
+        self._turn_running = False  # A reply is being generated right now
+        self._cron_pending = False  # A cron turn is queued or running
+        self._history_loaded = asyncio.Event()  # Set once the replay is written
 
     def compose(self) -> ComposeResult:
         """Create child widgets for the app."""
         yield Header(show_clock=True)
-        yield RichLog(id="chat_log", wrap=True, markup=True, highlight=True)
+        # Capped so a long-running session doesn't grow without bound
+        yield RichLog(
+            id="chat_log",
+            wrap=True,
+            markup=True,
+            highlight=True,
+            max_lines=self.config.tui.max_log_lines,
+        )
         yield Input(placeholder="> ", id="user_input")
         yield Static("? help | ^L clear | ^S status | ^C quit", id="shortcuts")
 
     async def on_mount(self) -> None:
         """Called when app starts."""
-        chat_log = self.query_one("#chat_log", RichLog)
+        # Cache the log widget rather than querying the DOM for every message
+        self._chat_log = chat_log = self.query_one("#chat_log", RichLog)
 
         # Welcome message
-        chat_log.write(Text("🦞 Welcome to PiLobster!", style="bold green"))
-        chat_log.write(Text(f"  Running {self.config.ollama.model}", style="dim"))
-        chat_log.write("")
-
-        # Load conversation history
-        history = await self.memory.get_history(limit=20)
-        self.last_message_count = len(history)
-        if history:
-            chat_log.write(Text("── Previous Conversation ──", style="dim"))
-            for msg in history:
-                content = msg["content"]
+        chat_log.write(Group(
+            Text("🦞 Welcome to PiLobster!", style="bold green"),
+            Text(f"  Running {self.config.ollama.model}", style="dim"),
+            Text(""),
+        ))
+
+        # Focus input
+        self.query_one("#user_input", Input).focus()
+
+        # Load the conversation in the background so the UI paints first
+        self.run_worker(self._load_conversation(), exclusive=False)
+        self.run_worker(self._drain_turns(), group="turns", exclusive=True)
 
+    async def _load_conversation(self):
+        """Replay recent history, then show new messages from Telegram as they are stored."""
+        try:
+            # Load the full context window now, so Memory's in-RAM copy is
+            # big enough to serve every turn without going back to the database
+            history = await self.memory.get_history(
+                max(REPLAY_MESSAGES, self.config.memory.max_history)
+            )
+            # Subscribe straight after the read (no await in between), so every
+            # later message is relayed exactly once
+            self._new_messages = self.memory.subscribe()
+
+            if history:
+                await self._replay_history(history[-REPLAY_MESSAGES:])
+        finally:
+            # Queued turns wait for this, so replies can't land in the
+            # middle of the old messages
+            self._history_loaded.set()
+        await self._relay_new_messages()
+
+    async def _replay_history(self, history: list):
+        """Write previous messages to the chat log, yielding between each."""
+        chat_log = self._chat_log
+        chat_log.write(Text("── Previous Conversation ──", style="dim"))
+        clean_response = self.agent.clean_response
+        for msg in history:
+            if msg["role"] == "user":
+                chat_log.write(Text(f"> {msg['content']}", style="cyan"))
+            else:
                 # Clean response for display
-                if msg["role"] == "assistant":
-                    content = self.agent.clean_response(content)
+                await self._write_markdown(chat_log, f"• {clean_response(msg['content'])}")
+            chat_log.write("")
 
-                if msg["role"] == "user":
-                    chat_log.write(Text(f"> {content}", style="cyan"))
-                else:
-                    chat_log.write(Markdown(f"• {content}"))
-                chat_log.write("")
+            # Let keypresses and repaints through between messages
+            await asyncio.sleep(0)
 
-        # Focus input
-        self.query_one("#user_input", Input).focus()
+    async def _drain_turns(self):
+        """Reply to queued messages one at a time, oldest first."""
+        await self._history_loaded.wait()
+        while True:
+            text, from_cron = await self._turns.get()
+            self._turn_running = True
+            try:
+                if from_cron:
+                    await self.display_status_message(
+                        f"Scheduled task triggered: {text}", emoji="⏰"
+                    )
+                # Process the message as if the user sent it
+                await self.process_message(text)
+            finally:
+                self._turn_running = False
+                if from_cron:
+                    self._cron_pending = False
+                self._turns.task_done()
+
+    async def queue_message(self, text: str):
+        """Queue a message for a reply once earlier ones are answered."""
+        if self._turn_running or not self._turns.empty():
+            await self.display_status_message(
+                "Queued — will reply after the current message", emoji="⏳"
+            )
+        await self._turns.put((text, False))
 
-        # Start background check for new messages from Telegram (every 2 seconds)
-        self.set_interval(2.0, self.check_for_new_messages)
+    def on_unmount(self) -> None:
+        """Called when app stops."""
+        if self._new_messages is not None:
+            self.memory.unsubscribe(self._new_messages)
+            self._new_messages = None
 
     async def on_input_submitted(self, event: Input.Submitted) -> None:
         """Handle user message submission."""
-        if self.processing:
-            return
-
         user_text = event.value.strip()
         if not user_text:
             return
@@ -136,88 +311,57 @@ class PiLobsterTUI(App):
         if user_text.startswith("/"):
             await self.handle_command(user_text)
         else:
-            # Process message
-            await self.process_message(user_text)
+            # Reply once any earlier messages are answered
+            await self.queue_message(user_text)
 
     async def handle_command(self, command: str):
         """Handle slash commands like /quit, /status, etc."""
-        parts = command.split()
-        cmd = parts[0].lower()
-        args = parts[1:] if len(parts) > 1 else []
-
-        if cmd == "/quit" or cmd == "/exit":
-            # Exit the app and raise SystemExit to terminate the entire process
-            self.exit()
-            raise SystemExit(0)
-
-        elif cmd == "/clear":
-            self.action_clear_history()
-
-        elif cmd == "/status":
-            self.action_show_status()
-
-        elif cmd == "/jobs":
-            await self.cmd_jobs()
-
-        elif cmd == "/schedule":
-            await self.cmd_schedule(args)
-
-        elif cmd == "/cancel":
-            await self.cmd_cancel(args)
-
-        elif cmd == "/workspace":
-            await self.cmd_workspace()
-
-        elif cmd == "/save":
-            await self.cmd_save(args)
-
-        elif cmd == "/memory":
-            await self.cmd_memory()
+        # maxsplit keeps /schedule's prompt (after the 5 cron fields) as one
+        # argument; other commands only look at their first
+        parts = command.split(maxsplit=6)
+        handler = _COMMANDS.get(parts[0].lower())
+        if handler is None:
+            # Unknown command, process as normal message
+            await self.queue_message(command)
+            return
+        await getattr(self, handler)(parts[1:])
 
-        elif cmd == "/forget":
-            await self.cmd_forget()
+    async def cmd_quit(self, args: list):
+        """Exit the app and raise SystemExit to terminate the entire process."""
+        self.exit()
+        raise SystemExit(0)
 
-        elif cmd == "/help":
-            help_text = """**Available Commands:**
+    async def cmd_clear(self, args: list):
+        """Clear chat history."""
+        self.action_clear_history()
 
-- `/quit` or `/exit` — Exit PiLobster
-- `/clear` — Clear chat history
-- `/status` — Show system status
-- `/jobs` — List scheduled cron jobs
-- `/schedule <cron> <message>` — Create a cron job
-- `/cancel <id>` — Cancel a cron job
-- `/workspace` — List workspace files
-- `/save <filename>` — Save last code block
-- `/memory` — View saved memories
-- `/forget` — Clear all memories
-- `/help` — Show this help message
+    async def cmd_status(self, args: list):
+        """Show system status."""
+        self.action_show_status()
 
-**Keyboard Shortcuts:**
-- `Ctrl+C` — Quit
-- `Ctrl+L` — Clear history
-- `Ctrl+S` — Show status"""
-            await self.display_message("assistant", help_text)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(help_text)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
-
-        else:
-            # Unknown command, process as normal message
-            await self.process_message(command)
+    async def cmd_help(self, args: list):
+        """Show available commands."""
+        await self.display_message("assistant", _HELP_TEXT)
+        await self._forward_to_telegram(_HELP_TEXT)
 
     async def process_message(self, user_text: str):
-        """Process user message through agent and display response."""
-        self.processing = True
+        """Process user message through agent and display response.
 
+        Called only from _drain_turns; use queue_message to ask for a reply.
+        """
+        notices = []  # (message, emoji) status lines, shown after the reply
         try:
             # Display user message
             await self.display_message("user", user_text)
 
             # Store user message
-            await self.memory.add_message("user", user_text)
+            await self.memory.add_message("user", user_text, source="tui")
+
+            # Send the user message to Telegram (prefixed to show it came
+            # from the TUI) while the model works on the reply
+            forward_user = asyncio.create_task(
+                self._forward_to_telegram(f"💻 TUI: {user_text}")
+            )
 
             # Get conversation history
             history = await self.memory.get_history(
@@ -227,84 +371,97 @@ class PiLobsterTUI(App):
             # Display thinking status
             await self.display_status_message("Thinking...", emoji="🤔")
 
-            # Get AI response
-            response = await self.agent.chat(history)
+            # Get AI response, showing it as it streams in
+            response = await self._stream_response(history)
 
-            # Clear thinking status
-            chat_log = self.query_one("#chat_log", RichLog)
-            # Remove last status message (thinking)
-            # Note: RichLog doesn't support removing, so we just continue
+            # Parse all blocks in one pass
+            parsed = await self.agent.parse_response(response)
 
-            # Parse for cron jobs
-            cron_jobs, cron_errors = self.agent.parse_cron_blocks(response)
+            # Create jobs and save files concurrently; their records are
+            # committed together, with a single fsync
+            async with self.memory.transaction():
+                (scheduled, job_errors), filepaths = await asyncio.gather(
+                    self.scheduler.add_jobs(parsed["cron_jobs"]),
+                    self.workspace.save_files(parsed["save_blocks"]),
+                )
 
             # Show validation errors if any
-            if cron_errors:
-                for error in cron_errors:
-                    await self.display_status_message(f"Cron error: {error}", emoji="⚠️")
-
-            # Create valid jobs
-            for job in cron_jobs:
-                job_id = await self.scheduler.add_job(
-                    job["schedule"], job["task"], job["message"]
-                )
-                await self.display_status_message(
-                    f"Scheduled job #{job_id}: {job['task']} ({job['schedule']})",
-                    emoji="✅",
-                )
+            for error in parsed["cron_errors"] + job_errors:
+                notices.append((f"Cron error: {error}", "⚠️"))
 
-            # Parse for file saves
-            save_blocks = self.agent.parse_save_blocks(response)
-            for block in save_blocks:
-                filepath = await self.workspace.save_file(
-                    block["filename"], block["content"]
-                )
-                await self.display_status_message(
-                    f"Saved {filepath.name} to workspace", emoji="💾"
+            for job_id, job in scheduled:
+                notices.append(
+                    (f"Scheduled job #{job_id}: {job['task']} ({job['schedule']})", "✅")
                 )
+            for filepath in filepaths:
+                notices.append((f"Saved {filepath.name} to workspace", "💾"))
 
-            # Parse for memory blocks
-            memory_blocks = self.agent.parse_memory_blocks(response)
-            for fact in memory_blocks:
+            # Save memories
+            for fact in parsed["memory"]:
                 if await self.agent.save_to_memory(fact):
-                    await self.display_status_message(f"Remembered: {fact}", emoji="🧠")
+                    notices.append((f"Remembered: {fact}", "🧠"))
 
             # Check if memory is getting too large
             is_large, line_count = self.agent.check_memory_size()
             if is_large:
-                await self.display_status_message(
-                    f"Memory file is large ({line_count} lines). Use /forget to clear.", emoji="⚠️"
+                notices.append(
+                    (f"Memory file is large ({line_count} lines). Use /forget to clear.", "⚠️")
                 )
 
-            # Display AI response
-            clean = self.agent.clean_response(response)
-            if clean:
-                await self.display_message("assistant", clean)
+            # All notices for the reply go to the log in one write
+            await self.display_status_messages(notices)
+            notices = []
+
+            clean = parsed["clean"]
 
             # Store assistant response
-            await self.memory.add_message("assistant", response)
-
-            # Send to Telegram if callback is set (in "both" mode)
-            if self.telegram_callback:
-                try:
-                    # Send the user message with a prefix to show it came from TUI
-                    await self.telegram_callback(f"💻 TUI: {user_text}")
-                    # Send the AI response
-                    if clean:
-                        await self.telegram_callback(clean)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self.memory.add_message("assistant", response, source="tui")
+
+            # Then the AI response, once the user message has gone
+            if await forward_user and clean:
+                await self._forward_to_telegram(clean)
 
         except Exception as e:
             logger.error(f"Error processing message: {e}")
-            await self.display_status_message(f"Error: {e}", emoji="❌")
+            # Still show what was done before the error
+            notices.append((f"Error: {e}", "❌"))
+            await self.display_status_messages(notices)
 
-        finally:
-            self.processing = False
+    async def _stream_response(self, history: List[dict]) -> str:
+        """Stream the model's response into the chat log, block by block.
+
+        Each finished Markdown block is cleaned (cron/save/memory blocks
+        removed) and rendered once; only the unfinished tail is held back
+        until the next piece arrives.
+
+        Returns: the full response text
+        """
+        chat_log = self._chat_log
+        parts = []
+        pending = ""
+        shown = False
+
+        async def show(block: str):
+            nonlocal shown
+            block = self.agent.clean_response(block).strip()
+            if block:
+                # Only the first block of the reply gets the bullet
+                await self._write_markdown(chat_log, block if shown else f"• {block}")
+                chat_log.write("")
+                shown = True
+
+        async for piece in self.agent.chat_stream(history):
+            parts.append(piece)
+            blocks, pending = split_complete_blocks(pending + piece)
+            for block in blocks:
+                await show(block)
+
+        await show(pending)
+        return "".join(parts)
 
     async def display_message(self, role: str, content: str):
         """Display a message in the chat log."""
-        chat_log = self.query_one("#chat_log", RichLog)
+        chat_log = self._chat_log
 
         if role == "user":
             # User message - show with >
@@ -312,20 +469,58 @@ class PiLobsterTUI(App):
         else:
             # Assistant message - show with •
             if content.strip():
-                chat_log.write(Markdown(f"• {content}"))
+                await self._write_markdown(chat_log, f"• {content}")
             else:
                 chat_log.write(Text("• (empty)", style="dim"))
 
         chat_log.write("")  # Add blank line for spacing
 
-        # Increment message count to prevent duplicates from sync
-        self.last_message_count += 1
+    async def _write_markdown(self, chat_log: RichLog, markdown: str):
+        """Write Markdown to the chat log, rendering it off the event loop.
+
+        Rich's Markdown parsing and layout are slow on a Pi, and would
+        otherwise stall input while long replies render.
+        """
+        if not _MARKDOWN_SYNTAX_RE.search(markdown):
+            # Nothing to format — skip the parser and the thread hop
+            chat_log.write(Text(markdown))
+            return
+
+        width = chat_log.scrollable_content_region.width
+        if width <= 0:
+            # Not laid out yet — let RichLog render it once it has a size
+            chat_log.write(Markdown(markdown))
+            return
+        chat_log.write(await asyncio.to_thread(_render_markdown, markdown, width))
 
     async def display_status_message(self, message: str, emoji: str = "ℹ️"):
         """Display a system status message."""
-        chat_log = self.query_one("#chat_log", RichLog)
+        chat_log = self._chat_log
         chat_log.write(Text(f"{emoji}  {message}", style="dim italic"), shrink=True)
 
+    async def display_status_messages(self, notices: List[Tuple[str, str]]):
+        """Display several (message, emoji) status lines as a single log write."""
+        if not notices:
+            return
+        lines = [Text(f"{emoji}  {message}", style="dim italic") for message, emoji in notices]
+        self._chat_log.write(Group(*lines), shrink=True)
+
+    async def _forward_to_telegram(self, message: str) -> bool:
+        """Send a message to Telegram, if connected (in "both" mode).
+
+        Failures are logged, not raised.
+
+        Returns: True if the message was sent
+        """
+        if not self.telegram_callback:
+            return False
+        try:
+            await self.telegram_callback(message)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send message to Telegram: {e}")
+            return False
+
     def set_telegram_callback(self, callback):
         """Set callback to send messages to Telegram.
 
@@ -346,41 +541,33 @@ class PiLobsterTUI(App):
             # Assistant/system message from Telegram
             await self.display_message_panel("PiLobster 🦞", message, "magenta")
 
-    async def check_for_new_messages(self):
-        """Check for new messages from Telegram and display them.
+    async def _relay_new_messages(self):
+        """Display messages stored by other interfaces (e.g. Telegram).
 
-        This allows TUI to show messages sent via Telegram in real-time.
+        Waits on the memory subscription, so nothing runs until a message
+        actually arrives. Messages this TUI stored itself are skipped.
         """
-        if self.processing:
-            return  # Don't check while processing our own message
+        while True:
+            msg = await self._new_messages.get()
+            if msg["source"] == "tui":
+                continue
 
-        try:
-            # Get current message count
-            history = await self.memory.get_history(limit=100)
-            current_count = len(history)
-
-            # If there are new messages, display them
-            if current_count > self.last_message_count:
-                # Get only the new messages
-                new_messages = history[self.last_message_count:]
-                for msg in new_messages:
-                    role = "You" if msg["role"] == "user" else "PiLobster 🦞"
-                    border_style = "blue" if msg["role"] == "user" else "magenta"
-                    content = msg["content"]
-
-                    # Clean response for display
-                    if msg["role"] == "assistant":
-                        content = self.agent.clean_response(content)
-
-                    await self.display_message_panel(role, content, border_style)
-
-                self.last_message_count = current_count
-        except Exception as e:
-            logger.error(f"Error checking for new messages: {e}")
+            try:
+                role = "You" if msg["role"] == "user" else "PiLobster 🦞"
+                border_style = "blue" if msg["role"] == "user" else "magenta"
+                content = msg["content"]
+
+                # Clean response for display
+                if msg["role"] == "assistant":
+                    content = self.agent.clean_response(content)
+
+                await self.display_message_panel(role, content, border_style)
+            except Exception as e:
+                logger.error(f"Error displaying new message: {e}")
 
     async def display_message_panel(self, role: str, content: str, border_style: str):
         """Display a message in the chat log with simple formatting."""
-        chat_log = self.query_one("#chat_log", RichLog)
+        chat_log = self._chat_log
 
         # Determine if this is a user or assistant message based on role
         if role in ["You", "📱 Telegram"]:
@@ -389,7 +576,7 @@ class PiLobsterTUI(App):
         else:
             # Assistant message - show with •
             if content.strip():
-                chat_log.write(Markdown(f"• {content}"))
+                await self._write_markdown(chat_log, f"• {content}")
             else:
                 chat_log.write(Text("• (empty)", style="dim"))
 
@@ -402,13 +589,17 @@ class PiLobsterTUI(App):
         """
         logger.info(f"Cron job triggered: {message}")
 
-        # Display notification
-        await self.display_status_message(
-            f"Scheduled task triggered: {message}", emoji="⏰"
-        )
+        # Don't let cron replies pile up behind a slow model
+        if self._cron_pending:
+            logger.warning(f"Skipping cron job, previous one still pending: {message}")
+            await self.display_status_message(
+                f"Skipped scheduled task (previous one still pending): {message}", emoji="⏭️"
+            )
+            return
 
-        # Process the message as if the user sent it
-        await self.process_message(message)
+        # Queued behind any conversation in progress, rather than racing it
+        self._cron_pending = True
+        await self._turns.put((message, True))
 
     def action_quit(self) -> None:
         """Quit the application (Ctrl+C or Ctrl+Q)."""
@@ -417,125 +608,77 @@ class PiLobsterTUI(App):
 
     def action_clear_history(self) -> None:
         """Clear chat history (Ctrl+L)."""
-
-        async def _clear():
-            await self.memory.clear_history()
-            chat_log = self.query_one("#chat_log", RichLog)
-            chat_log.clear()
-            message = "Chat history cleared"
-            await self.display_status_message(message, emoji="🧹")
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(f"🧹 {message}")
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
-
-        asyncio.create_task(_clear())
+        # Tracked by Textual; a repeat keypress replaces any clear in flight
+        self.run_worker(self._clear_history(), group="clear", exclusive=True)
+
+    async def _clear_history(self):
+        """Clear stored and displayed history, and tell Telegram."""
+        await self.memory.clear_history()
+        chat_log = self._chat_log
+        chat_log.clear()
+        message = "Chat history cleared"
+        await self.display_status_message(message, emoji="🧹")
+        await self._forward_to_telegram(f"🧹 {message}")
 
     def action_show_status(self) -> None:
         """Show system status (Ctrl+S)."""
+        # Tracked by Textual; a repeat keypress replaces any status in flight
+        self.run_worker(self._show_status(), group="status", exclusive=True)
 
-        async def _show_status():
-            jobs = await self.scheduler.list_jobs()
-            files = self.workspace.list_files()
-
-            chat_log = self.query_one("#chat_log", RichLog)
-            chat_log.write(Text("🦞 System Status", style="bold green"))
-            chat_log.write(Text(f"  Model: {self.config.ollama.model}"))
-            chat_log.write(Text(f"  Host: {self.config.ollama.host}"))
-            chat_log.write(Text(f"  Context: {self.config.ollama.context_length} tokens"))
-            chat_log.write(Text(f"  Scheduled jobs: {len(jobs)}"))
-            chat_log.write(Text(f"  Workspace files: {len(files)}"))
-            chat_log.write("")
+    async def _show_status(self):
+        """Write system status to the chat log, and send it to Telegram."""
+        jobs = await self.scheduler.list_jobs()
+        file_count = await asyncio.to_thread(self.workspace.count_files)
+
+        # One write for the whole block, rather than a layout pass per line
+        self._chat_log.write(Group(
+            Text("🦞 System Status", style="bold green"),
+            Text(f"  Model: {self.config.ollama.model}"),
+            Text(f"  Host: {self.config.ollama.host}"),
+            Text(f"  Context: {self.config.ollama.context_length} tokens"),
+            Text(f"  Scheduled jobs: {len(jobs)}"),
+            Text(f"  Workspace files: {file_count}"),
+            Text(""),
+        ))
 
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    status_text = f"""**Model:** `{self.config.ollama.model}`
+        if self.telegram_callback:
+            status_text = f"""**Model:** `{self.config.ollama.model}`
 **Host:** `{self.config.ollama.host}`
 **Context:** `{self.config.ollama.context_length}` tokens
 **Scheduled jobs:** `{len(jobs)}`
-**Workspace files:** `{len(files)}`"""
-                    await self.telegram_callback(f"🦞 System Status\n\n{status_text}")
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
-
-        asyncio.create_task(_show_status())
+**Workspace files:** `{file_count}`"""
+            await self._forward_to_telegram(f"🦞 System Status\n\n{status_text}")
 
-    async def cmd_jobs(self):
+    async def cmd_jobs(self, args: list):
         """List scheduled cron jobs."""
         jobs = await self.scheduler.list_jobs()
         if not jobs:
             message = "No scheduled jobs. Ask me to schedule something!"
             await self.display_message("assistant", message)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(message)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(message)
             return
 
-        lines = ["**Scheduled Jobs**\n"]
-        for job in jobs:
-            lines.append(f"#{job['id']} — {job['task']}\n  Schedule: `{job['schedule']}`")
-
-        message = "\n".join(lines)
+        message = "**Scheduled Jobs**\n\n" + "\n".join(
+            f"#{job['id']} — {job['task']}\n  Schedule: `{job['schedule']}`"
+            for job in jobs
+        )
         await self.display_message("assistant", message)
-        # Send to Telegram
-        if self.telegram_callback:
-            try:
-                await self.telegram_callback(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to Telegram: {e}")
+        await self._forward_to_telegram(message)
 
     async def cmd_schedule(self, args: list):
-        """Manually create a cron job."""
-        # Check if arguments were provided
-        if not args or len(args) < 6:
-            help_text = """**Usage:** `/schedule <cron> <prompt>`
+        """Manually create a cron job.
 
-The prompt will be sent to me when the job triggers.
-
-**Cron format:** `minute hour day month weekday`
-
-**Examples:**
-- `/schedule */3 * * * * Tell me a joke`
-- `/schedule 0 9 * * * Give me a motivational quote`
-- `/schedule 30 14 * * 1-5 Remind me to stand up`
-
-**Common patterns:**
-- `*/5 * * * *` — Every 5 minutes
-- `0 * * * *` — Every hour
-- `0 9 * * *` — Daily at 9am
-- `0 9 * * 1` — Every Monday at 9am"""
+        args holds the 5 cron fields followed by the whole prompt.
+        """
+        # Check if arguments were provided
+        if len(args) < 6:
+            help_text = _SCHEDULE_USAGE
             await self.display_message("assistant", help_text)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(help_text)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(help_text)
             return
 
-        # Parse cron expression (first 5 args) and message (remaining args)
-        cron_parts = args[:5]
-        message_parts = args[5:]
-
-        schedule = " ".join(cron_parts)
-        message = " ".join(message_parts)
-
-        if not message:
-            error_msg = "❌ Prompt cannot be empty.\nUsage: `/schedule <cron> <prompt>`"
-            await self.display_message("assistant", error_msg)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(error_msg)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
-            return
+        schedule = " ".join(args[:5])
+        message = args[5]
 
         # Create a task description from the message (truncate if needed)
         task = message[:50] + "..." if len(message) > 50 else message
@@ -545,42 +688,22 @@ The prompt will be sent to me when the job triggers.
             job_id = await self.scheduler.add_job(schedule, task, message)
             result = f"✅ Scheduled job #{job_id}: {task}\nSchedule: `{schedule}`\nMessage: {message}"
             await self.display_message("assistant", result)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(result)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(result)
         except ValueError as e:
             error = f"❌ Invalid cron expression: {e}\n\nCron format: `minute hour day month weekday`\nExample: `*/3 * * * *` (every 3 minutes)"
             await self.display_message("assistant", error)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(error)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(error)
         except Exception as e:
             error_msg = f"❌ Error creating job: {e}"
             await self.display_message("assistant", error_msg)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(error_msg)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(error_msg)
 
     async def cmd_cancel(self, args: list):
         """Cancel a scheduled job by ID."""
         if not args:
             message = "Usage: `/cancel <job_id>`"
             await self.display_message("assistant", message)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(message)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(message)
             return
 
         try:
@@ -588,12 +711,7 @@ The prompt will be sent to me when the job triggers.
         except ValueError:
             message = "Job ID must be a number."
             await self.display_message("assistant", message)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(message)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(message)
             return
 
         success = await self.scheduler.cancel_job(job_id)
@@ -603,40 +721,20 @@ The prompt will be sent to me when the job triggers.
             message = f"Job #{job_id} not found."
 
         await self.display_message("assistant", message)
-        # Send to Telegram
-        if self.telegram_callback:
-            try:
-                await self.telegram_callback(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to Telegram: {e}")
+        await self._forward_to_telegram(message)
 
-    async def cmd_workspace(self):
+    async def cmd_workspace(self, args: list):
         """List files in workspace."""
-        files = self.workspace.list_files()
+        files = await asyncio.to_thread(self.workspace.list_files_formatted)
         if not files:
             message = "Workspace is empty. Ask me to write some code!"
             await self.display_message("assistant", message)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(message)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(message)
             return
 
-        lines = ["**Workspace Files**\n"]
-        for f in files:
-            size_kb = f["size"] / 1024
-            lines.append(f"`{f['name']}` ({size_kb:.1f} KB)")
-
-        message = "\n".join(lines)
+        message = "**Workspace Files**\n\n" + "\n".join(files)
         await self.display_message("assistant", message)
-        # Send to Telegram
-        if self.telegram_callback:
-            try:
-                await self.telegram_callback(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to Telegram: {e}")
+        await self._forward_to_telegram(message)
 
     async def cmd_save(self, args: list):
         """Manually save code from last response."""
@@ -644,12 +742,7 @@ The prompt will be sent to me when the job triggers.
         if not args:
             message = "**Usage:** `/save filename.py`\n\nThis will save the last code block from my response."
             await self.display_message("assistant", message)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(message)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(message)
             return
 
         filename = args[0]
@@ -669,12 +762,7 @@ The prompt will be sent to me when the job triggers.
         if not last_code:
             message = "❌ No code blocks found in recent conversation. Ask me to write some code first!"
             await self.display_message("assistant", message)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(message)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(message)
             return
 
         # Save the code
@@ -682,23 +770,13 @@ The prompt will be sent to me when the job triggers.
             filepath = await self.workspace.save_file(filename, last_code)
             message = f"💾 Saved `{filepath.name}` to workspace"
             await self.display_message("assistant", message)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(message)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
+            await self._forward_to_telegram(message)
         except Exception as e:
             message = f"❌ Error saving file: {e}"
             await self.display_message("assistant", message)
-            # Send to Telegram
-            if self.telegram_callback:
-                try:
-                    await self.telegram_callback(message)
-                except Exception as e:
-                    logger.error(f"Failed to send message to Telegram: {e}")
-
-    async def cmd_memory(self):
+            await self._forward_to_telegram(message)
+
+    async def cmd_memory(self, args: list):
         """Display current memory."""
         if self.agent.memory_content:
             is_large, line_count = self.agent.check_memory_size()
@@ -710,14 +788,9 @@ The prompt will be sent to me when the job triggers.
             message = "**🧠 My Memory**\n\nNo memories saved yet. Tell me something about yourself!"
 
         await self.display_message("assistant", message)
-        # Send to Telegram
-        if self.telegram_callback:
-            try:
-                await self.telegram_callback(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to Telegram: {e}")
+        await self._forward_to_telegram(message)
 
-    async def cmd_forget(self):
+    async def cmd_forget(self, args: list):
         """Clear all memory."""
         if self.agent.clear_memory():
             message = "🧹 All memories have been forgotten."
@@ -725,9 +798,4 @@ The prompt will be sent to me when the job triggers.
             message = "❌ Failed to clear memory."
 
         await self.display_message("assistant", message)
-        # Send to Telegram
-        if self.telegram_callback:
-            try:
-                await self.telegram_callback(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to Telegram: {e}")
+        await self._forward_to_telegram(message)
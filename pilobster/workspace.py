@@ -1,8 +1,10 @@
 """Workspace manager — handles saving generated files."""
 
+import asyncio
 import logging
+import os
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from .memory import Memory
 
@@ -16,6 +18,8 @@ class Workspace:
         self.path = Path(path)
         self.memory = memory
         self.path.mkdir(parents=True, exist_ok=True)
+        # (directory mtime, file count) — recounted only when the folder changes
+        self._count_cache: Optional[Tuple[int, int]] = None
 
     async def save_file(self, filename: str, content: str) -> Path:
         """Save content to a file in the workspace.
@@ -27,36 +31,73 @@ class Workspace:
         if not safe_name:
             safe_name = "untitled.txt"
 
-        filepath = self.path / safe_name
-
-        # Don't overwrite — add a number suffix if the file exists
-        if filepath.exists():
-            stem = filepath.stem
-            suffix = filepath.suffix
-            counter = 1
-            while filepath.exists():
-                filepath = self.path / f"{stem}_{counter}{suffix}"
-                counter += 1
-
-        filepath.write_text(content)
+        # Disk I/O can stall on an SD card — keep it off the event loop
+        filepath = await asyncio.to_thread(self._write_new_file, safe_name, content)
         await self.memory.log_file(filepath.name, f"Generated file: {safe_name}")
         logger.info(f"Saved file: {filepath}")
         return filepath
 
+    async def save_files(self, blocks: List[dict]) -> List[Path]:
+        """Save several files, each block needing "filename" and "content" keys.
+
+        Saved one after another, so two blocks with the same name get
+        distinct suffixes instead of racing for the same path.
+        Returns the saved paths, in order.
+        """
+        return [await self.save_file(block["filename"], block["content"]) for block in blocks]
+
+    def _write_new_file(self, safe_name: str, content: str) -> Path:
+        """Write content under a name that doesn't clash with existing files.
+
+        Returns:
+            Path of the written file
+        """
+        filepath = self.path / safe_name
+        stem = filepath.stem
+        suffix = filepath.suffix
+        counter = 0
+
+        # Don't overwrite — add a number suffix if the file exists. Mode "x"
+        # (O_CREAT | O_EXCL) checks and creates in one atomic open, so a
+        # concurrent save can't claim the same name in between
+        while True:
+            try:
+                with open(filepath, "x") as f:
+                    f.write(content)
+                return filepath
+            except FileExistsError:
+                counter += 1
+                filepath = self.path / f"{stem}_{counter}{suffix}"
+
     def list_files(self) -> List[dict]:
-        """List all files in the workspace."""
-        files = []
-        for item in sorted(self.path.iterdir()):
-            if item.is_file():
-                stat = item.stat()
-                files.append(
-                    {
-                        "name": item.name,
-                        "size": stat.st_size,
-                        "modified": stat.st_mtime,
-                    }
-                )
-        return files
+        """List all files in the workspace, sorted by name."""
+        # scandir gets the file type from the directory listing itself, so
+        # each file costs one stat rather than a Path plus two stats
+        with os.scandir(self.path) as it:
+            entries = [(entry.name, entry.stat()) for entry in it if entry.is_file()]
+        entries.sort(key=lambda entry: entry[0])
+        return [
+            {"name": name, "size": stat.st_size, "modified": stat.st_mtime}
+            for name, stat in entries
+        ]
+
+    def count_files(self) -> int:
+        """Count the files in the workspace.
+
+        The count is cached against the directory's mtime, which changes
+        whenever a file is added, removed or renamed — so an unchanged
+        workspace costs a single stat.
+        """
+        mtime = os.stat(self.path).st_mtime_ns
+        if self._count_cache is None or self._count_cache[0] != mtime:
+            with os.scandir(self.path) as entries:
+                count = sum(1 for entry in entries if entry.is_file())
+            self._count_cache = (mtime, count)
+        return self._count_cache[1]
+
+    def list_files_formatted(self) -> List[str]:
+        """List workspace files as display lines, e.g. "`hello.py` (1.2 KB)"."""
+        return [f"`{f['name']}` ({f['size'] / 1024:.1f} KB)" for f in self.list_files()]
 
     def read_file(self, filename: str) -> Optional[str]:
         """Read a file from the workspace."""